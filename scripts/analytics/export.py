@@ -0,0 +1,92 @@
+import csv
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_DIR = "data/processed/analytics"
+
+# Postgres type OIDs -> Arrow types for streamed Parquet; anything else is written as text
+ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(), 21: pa.int64(), 23: pa.int64(),
+    700: pa.float64(), 701: pa.float64(), 1700: pa.float64(),
+    1082: pa.date32(),
+    1114: pa.timestamp("us")
+}
+
+
+def export_path(name, fmt):
+    return f"{EXPORT_DIR}/{name}.{fmt}"
+
+
+def decimals_to_float(df):
+    # psycopg2 returns NUMERIC as Decimal objects; write them as floats like the CSV exports
+    decimals = [c for c in df.columns if df[c].map(lambda v: isinstance(v, Decimal)).any()]
+    return df.astype({c: "float64" for c in decimals})
+
+
+# ---------- IN-MEMORY ----------
+def write_dataframe(df, path, fmt):
+    """Write a fully fetched result; returns (rows, columns)."""
+    if fmt == "parquet":
+        decimals_to_float(df).to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return len(df), len(df.columns)
+
+
+# ---------- STREAMING ----------
+# Both paths keep memory flat regardless of result size: CSV is produced by the
+# server and streamed straight to disk, Parquet is fetched through a named
+# (server-side) cursor and written one row group per chunk.
+def inline_params(cur, sql, params):
+    # COPY can't take bind parameters; mogrify inlines them as literals, which
+    # still lets the planner prune fact_sales partitions
+    return cur.mogrify(sql.strip().rstrip(";"), params).decode()
+
+
+def stream_csv(conn, sql, params, path):
+    with conn.cursor() as cur, open(path, "w", newline="") as f:
+        cur.copy_expert(f"COPY ({inline_params(cur, sql, params)}) TO STDOUT WITH (FORMAT csv, HEADER true)", f)
+        rows = cur.rowcount
+    with open(path, newline="") as f:
+        columns = len(next(csv.reader(f), []))
+    return rows, columns
+
+
+def arrow_schema(description):
+    return pa.schema([(col.name, ARROW_TYPES.get(col.type_code, pa.string())) for col in description])
+
+
+def chunk_table(records, description, schema):
+    df = pd.DataFrame.from_records(records, columns=[col.name for col in description])
+    df = decimals_to_float(df)
+    # text columns are cast so non-string values (intervals, etc.) keep a single type
+    for field in schema:
+        if field.type == pa.string():
+            df[field.name] = df[field.name].map(lambda v: None if pd.isna(v) else str(v))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def stream_parquet(conn, sql, params, path, chunk_rows=50_000):
+    rows = 0
+    writer = None
+    with conn.cursor(name="analytics_export") as cur:
+        cur.itersize = chunk_rows
+        cur.execute(sql, params)
+        try:
+            while True:
+                records = cur.fetchmany(chunk_rows)
+                if writer is None:
+                    schema = arrow_schema(cur.description)
+                    writer = pq.ParquetWriter(path, schema)
+                if not records:
+                    break
+                writer.write_table(chunk_table(records, cur.description, schema))
+                rows += len(records)
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows, len(schema)
@@ -1,20 +1,30 @@
 # scripts/transformation/generate_analytics.py
 
-import psycopg2
 import pandas as pd
 import json
+import shutil
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
 
-# PostgreSQL connection parameters
-conn_params = {
-    "host": "localhost",
-    "database": "ecommerce_db",
-    "user": "postgres",
-    "password": "Sowmyasunkara@123"
-}
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.config import load_config
+from scripts.utils.db import get_pool
+from scripts.utils.metrics import bind, file_size, record_write, step
+from scripts.analytics import profiling, result_cache
+from scripts.analytics.export import export_path, stream_csv, stream_parquet, write_dataframe
+
+ANALYTICS_CFG = load_config().get("analytics", {})
+CACHE_CFG = ANALYTICS_CFG.get("cache", {})
+EXPORT_FORMAT = ANALYTICS_CFG.get("export_format", "csv")
+PROFILE_CFG = ANALYTICS_CFG.get("profile", {})
 
 # Dictionary of queries
 queries = {
@@ -27,13 +37,14 @@ queries = {
     FROM warehouse.fact_sales f
     JOIN warehouse.dim_products p
       ON f.product_key = p.product_key
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
     GROUP BY p.product_name, p.category
     ORDER BY total_revenue DESC
     LIMIT 10;
     """,
 
     "query2_monthly_trend": """
-    SELECT CONCAT(d.year, '-', LPAD(d.month::text,2,'0')) AS year_month,
+    SELECT d.year_month,
            SUM(f.line_total) AS total_revenue,
            COUNT(DISTINCT f.transaction_id) AS total_transactions,
            ROUND(SUM(f.line_total)/COUNT(DISTINCT f.transaction_id),2) AS avg_order_value,
@@ -41,8 +52,9 @@ queries = {
     FROM warehouse.fact_sales f
     JOIN warehouse.dim_date d
       ON f.date_key = d.date_key
-    GROUP BY year_month
-    ORDER BY year_month;
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
+    GROUP BY d.year_month
+    ORDER BY d.year_month;
     """,
 
     "query3_customer_segmentation": """
@@ -56,6 +68,7 @@ queries = {
         FROM warehouse.fact_sales f
         JOIN warehouse.dim_customers c
           ON f.customer_key = c.customer_key
+        WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
         GROUP BY f.customer_key, c.customer_id, c.full_name
     )
     SELECT CASE 
@@ -79,6 +92,7 @@ queries = {
     FROM warehouse.fact_sales f
     JOIN warehouse.dim_products p
       ON f.product_key = p.product_key
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
     GROUP BY p.category
     ORDER BY total_revenue DESC;
 
@@ -89,6 +103,7 @@ queries = {
         SELECT COUNT(*) AS total_transactions,
                SUM(line_total) AS total_revenue
         FROM warehouse.fact_sales
+        WHERE date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
     )
     SELECT pm.payment_method_name AS payment_method,
            COUNT(f.sales_key) AS transaction_count,
@@ -99,6 +114,7 @@ queries = {
     JOIN warehouse.dim_payment_method pm
       ON f.payment_method_key = pm.payment_method_key
     CROSS JOIN total t
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
     GROUP BY pm.payment_method_name, t.total_transactions, t.total_revenue
     ORDER BY transaction_count DESC;
     """,
@@ -111,21 +127,25 @@ queries = {
     FROM warehouse.fact_sales f
     JOIN warehouse.dim_customers c
       ON f.customer_key = c.customer_key
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
     GROUP BY c.state
     ORDER BY total_revenue DESC;
     """,
 
     "query7_customer_lifetime_value": """
-    SELECT c.customer_id,
-          c.full_name,
+    SELECT cur.customer_id,
+          cur.full_name,
           SUM(f.line_total) AS total_spent,
           COUNT(DISTINCT f.transaction_id) AS transaction_count,
-          (CURRENT_DATE - c.registration_date) AS days_since_registration,
+          (CURRENT_DATE - cur.registration_date) AS days_since_registration,
           ROUND(SUM(f.line_total)/COUNT(DISTINCT f.transaction_id),2) AS avg_order_value
     FROM warehouse.fact_sales f
     JOIN warehouse.dim_customers c
       ON f.customer_key = c.customer_key
-    GROUP BY c.customer_id, c.full_name, c.registration_date
+    JOIN warehouse.dim_customers cur
+      ON cur.customer_id = c.customer_id AND cur.is_current
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
+    GROUP BY cur.customer_id, cur.full_name, cur.registration_date
     ORDER BY total_spent DESC;
     """,
 
@@ -137,6 +157,7 @@ queries = {
     FROM warehouse.fact_sales f
     JOIN warehouse.dim_products p
       ON f.product_key = p.product_key
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
     GROUP BY p.product_name, p.category
     ORDER BY revenue DESC
     LIMIT 10;
@@ -150,16 +171,9 @@ queries = {
     FROM warehouse.fact_sales f
     JOIN warehouse.dim_date d
       ON f.date_key = d.date_key
-    GROUP BY d.day_name
-    ORDER BY CASE d.day_name
-        WHEN 'Monday' THEN 1
-        WHEN 'Tuesday' THEN 2
-        WHEN 'Wednesday' THEN 3
-        WHEN 'Thursday' THEN 4
-        WHEN 'Friday' THEN 5
-        WHEN 'Saturday' THEN 6
-        WHEN 'Sunday' THEN 7
-    END;
+    WHERE f.date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
+    GROUP BY d.day_of_week, d.day_name
+    ORDER BY d.day_of_week;
     """,
 
     "query10_discount_impact": """
@@ -168,13 +182,14 @@ queries = {
            line_total,
            0 AS discount_percentage   -- fallback, since original_price missing
     FROM warehouse.fact_sales
+    WHERE date_key BETWEEN %(date_key_from)s AND %(date_key_to)s
     )
     SELECT CASE
-           WHEN discount_percentage = 0 THEN '0%'
-           WHEN discount_percentage <=10 THEN '1-10%'
-           WHEN discount_percentage <=25 THEN '11-25%'
-           WHEN discount_percentage <=50 THEN '26-50%'
-           ELSE '50%+'
+           WHEN discount_percentage = 0 THEN '0%%'
+           WHEN discount_percentage <=10 THEN '1-10%%'
+           WHEN discount_percentage <=25 THEN '11-25%%'
+           WHEN discount_percentage <=50 THEN '26-50%%'
+           ELSE '50%%+'
        END AS discount_range,
        ROUND(AVG(discount_percentage),2) AS avg_discount_pct,
        SUM(quantity) AS total_quantity_sold,
@@ -186,36 +201,202 @@ queries = {
     """
 }
 
+# Unbounded runs read the materialized views the warehouse ETL refreshes
+# (sql/ddl/create_analytics_views.sql) instead of rescanning fact_sales
+view_queries = {
+    "query2_monthly_trend": """
+    SELECT year_month, total_revenue, total_transactions, avg_order_value, unique_customers
+    FROM warehouse.mv_monthly_trend
+    ORDER BY year_month;
+    """,
+
+    "query3_customer_segmentation": """
+    SELECT spending_segment, customer_count, total_revenue, avg_transaction_value
+    FROM warehouse.mv_customer_segmentation
+    ORDER BY spending_segment;
+    """,
+
+    "query6_geographic_analysis": """
+    SELECT state, total_revenue, total_customers, avg_revenue_per_customer
+    FROM warehouse.mv_geographic_analysis
+    ORDER BY total_revenue DESC;
+    """,
+
+    "query7_customer_lifetime_value": """
+    SELECT customer_id,
+           full_name,
+           total_spent,
+           transaction_count,
+           (CURRENT_DATE - registration_date) AS days_since_registration,
+           avg_order_value
+    FROM warehouse.mv_customer_lifetime_value
+    ORDER BY total_spent DESC;
+    """
+}
+
+def select_queries():
+    # the views hold all-time results, so any date bound means querying fact_sales
+    bounded = ANALYTICS_CFG.get("date_from") or ANALYTICS_CFG.get("date_to")
+    if bounded or not ANALYTICS_CFG.get("use_views", True):
+        return dict(queries)
+    return {name: view_queries.get(name, sql) for name, sql in queries.items()}
+
+# fact_sales is range-partitioned by month on date_key; bounding every query
+# on f.date_key with literal values lets the planner prune partitions.
+def date_key_params():
+    date_from = ANALYTICS_CFG.get("date_from")
+    date_to = ANALYTICS_CFG.get("date_to")
+    return {
+        "date_key_from": int(pd.Timestamp(date_from).strftime("%Y%m%d")) if date_from else 0,
+        "date_key_to": int(pd.Timestamp(date_to).strftime("%Y%m%d")) if date_to else 99991231
+    }
+
 # Execute query and return DataFrame
-def execute_query(connection, sql):
-    return pd.read_sql(sql, connection)
+def execute_query(connection, sql, params=None):
+    return pd.read_sql(sql, connection, params=params)
 
-# Export DataFrame to CSV
-def export_to_csv(df, filename):
-    df.to_csv(f"data/processed/analytics/{filename}", index=False)
+# Export a query result to data/processed/analytics; returns (rows, columns).
+# Streaming exports never hold the full result in memory.
+def export_query(connection, name, sql, params):
+    path = export_path(name, EXPORT_FORMAT)
+    if not ANALYTICS_CFG.get("streaming", False):
+        return write_dataframe(execute_query(connection, sql, params), path, EXPORT_FORMAT)
+    if EXPORT_FORMAT == "parquet":
+        return stream_parquet(connection, sql, params, path, ANALYTICS_CFG.get("chunk_rows", 50_000))
+    return stream_csv(connection, sql, params, path)
 
-def main():
+# Run one query on a pooled connection; failures are recorded, not raised,
+# so one bad query doesn't abort the others. With a warehouse `version`, result
+# files are served from / saved to the result cache.
+def run_query(pool, name, sql, params, version=None):
+    q_start = time.time()
+    key = result_cache.cache_key(sql, params, version, EXPORT_FORMAT) if version else None
+    cached = result_cache.lookup(key) if key else None
+    if cached is not None:
+        cached_path, meta = cached
+        shutil.copyfile(cached_path, export_path(name, EXPORT_FORMAT))
+        record_write(f"analytics.{name}", meta["rows"], file_size(export_path(name, EXPORT_FORMAT)))
+        print(f"{name} exported with {meta['rows']} rows (cached).")
+        return {
+            "status": "success",
+            "cache": "hit",
+            "rows": meta["rows"],
+            "columns": meta["columns"],
+            "execution_time_ms": round((time.time() - q_start) * 1000, 2)
+        }
+
+    conn = pool.getconn()
+    try:
+        rows, columns = export_query(conn, name, sql, params)
+        conn.rollback()  # end the read-only transaction before the connection goes back
+        if key:
+            result_cache.store(key, export_path(name, EXPORT_FORMAT), {
+                "query": name, "params": params, "warehouse_version": version,
+                "rows": rows, "columns": columns
+            })
+        record_write(f"analytics.{name}", rows, file_size(export_path(name, EXPORT_FORMAT)))
+        print(f"{name} exported with {rows} rows.")
+        return {
+            "status": "success",
+            "cache": "miss" if key else "disabled",
+            "rows": rows,
+            "columns": columns,
+            "execution_time_ms": round((time.time() - q_start) * 1000, 2)
+        }
+    except Exception as e:
+        conn.rollback()
+        print(f"{name} failed: {e}")
+        return {
+            "status": "failed",
+            "error": str(e),
+            "execution_time_ms": round((time.time() - q_start) * 1000, 2)
+        }
+    finally:
+        pool.putconn(conn)
+
+# EXPLAIN ANALYZE each query (re-executing it) and compare with the plan saved
+# by the previous profiled run. Runs serially so timings aren't skewed by the
+# other queries competing for the server.
+def profile_queries(pool, run_queries, params):
+    profiles = {}
+    conn = pool.getconn()
+    try:
+        for name, sql in run_queries.items():
+            try:
+                plan = profiling.explain_query(conn, sql, params)
+            except Exception as e:
+                conn.rollback()
+                profiles[name] = {"error": str(e)}
+                continue
+            summary = profiling.summarize_plan(plan)
+            summary["regressions"] = profiling.find_regressions(
+                summary, profiling.load_previous(name),
+                PROFILE_CFG.get("time_regression_pct", 25), PROFILE_CFG.get("row_estimate_factor", 10)
+            )
+            profiling.save_plan(name, plan, summary)
+            profiles[name] = summary
+    finally:
+        pool.putconn(conn)
+    return profiles
+
+def main(pool=None):
     results_summary = {}
     start_time = time.time()
 
-    conn = psycopg2.connect(**conn_params)
-
-    for name, sql in queries.items():
-        q_start = time.time()
-        df = execute_query(conn, sql)
-        export_to_csv(df, f"{name}.csv")
-        q_end = time.time()
-        results_summary[name] = {
-            "rows": len(df),
-            "columns": len(df.columns),
-            "execution_time_ms": round((q_end - q_start) * 1000, 2)
-        }
-        print(f"{name} exported with {len(df)} rows.")
+    # the queries are independent reads, so they run side by side and total
+    # wall time tracks the slowest query rather than the sum
+    workers = min(ANALYTICS_CFG.get("workers", 4), len(queries))
+    shared_pool = pool
+    pool = shared_pool or get_pool(workers)
+    params = date_key_params()
+    run_queries = select_queries()
+    version = None
+
+    try:
+        if CACHE_CFG.get("enabled", True):
+            conn = pool.getconn()
+            try:
+                version = result_cache.warehouse_version(conn)
+            finally:
+                pool.putconn(conn)
 
-    conn.close()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(bind(run_query), pool, name, sql, params, version)
+                for name, sql in run_queries.items()
+            }
+            for name, future in futures.items():
+                results_summary[name] = future.result()
+
+        if PROFILE_CFG.get("enabled", False):
+            for name, profile in profile_queries(pool, run_queries, params).items():
+                results_summary[name]["profile"] = profile
+    finally:
+        if shared_pool is None:
+            pool.closeall()
+
+    failed = [name for name in queries if results_summary[name]["status"] == "failed"]
 
     results_summary["generation_timestamp"] = datetime.now().isoformat()
-    results_summary["queries_executed"] = len(queries)
+    results_summary["queries_executed"] = len(queries) - len(failed)
+    results_summary["queries_failed"] = failed
+    results_summary["workers"] = workers
+    results_summary["export_format"] = EXPORT_FORMAT
+    results_summary["streaming"] = ANALYTICS_CFG.get("streaming", False)
+    results_summary["queries_from_views"] = [name for name in queries if run_queries[name] is not queries[name]]
+    results_summary["warehouse_version"] = version
+    results_summary["cache_hits"] = sum(results_summary[name].get("cache") == "hit" for name in queries)
+    results_summary["cache_misses"] = sum(results_summary[name].get("cache") == "miss" for name in queries)
+    if version:
+        results_summary["cache_evicted"] = result_cache.evict(
+            CACHE_CFG.get("max_age_hours"), CACHE_CFG.get("max_size_mb")
+        )
+    if PROFILE_CFG.get("enabled", False):
+        results_summary["profile_regressions"] = {
+            name: results_summary[name]["profile"]["regressions"]
+            for name in queries if results_summary[name]["profile"].get("regressions")
+        }
+    results_summary["date_key_range"] = [params["date_key_from"], params["date_key_to"]]
     results_summary["total_execution_time_seconds"] = round(time.time() - start_time, 2)
 
     with open("data/processed/analytics/analytics_summary.json", "w") as f:
@@ -223,5 +404,9 @@ def main():
 
     print("Analytics summary generated.")
 
+    if failed:
+        raise RuntimeError(f"Analytics queries failed: {', '.join(failed)}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with step("analytics"):
+        main()
\ No newline at end of file
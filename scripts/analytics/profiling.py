@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+PLAN_DIR = "data/processed/analytics/plans"
+
+
+def explain_query(conn, sql, params):
+    """Run `sql` under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON); returns the top-level plan document."""
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql.strip().rstrip(";"), params)
+        plan = cur.fetchone()[0]
+    conn.rollback()
+    return plan[0]
+
+
+# ---------- PLAN ANALYSIS ----------
+def walk_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+def relation_family(relation):
+    # monthly partitions (fact_sales_202311) count as their parent table
+    return "fact_sales" if relation.startswith("fact_sales") else relation
+
+
+def row_estimate_error(node):
+    """Ratio between actual and estimated rows for a node (1.0 = perfect estimate)."""
+    loops = node.get("Actual Loops", 1) or 1
+    actual = node.get("Actual Rows", 0) * loops
+    estimated = node.get("Plan Rows", 0) * loops
+    return max(actual, estimated, 1) / max(min(actual, estimated), 1)
+
+
+def summarize_plan(plan):
+    nodes = list(walk_plan(plan["Plan"]))
+    worst = max(nodes, key=row_estimate_error)
+    return {
+        "execution_time_ms": round(plan.get("Execution Time", 0), 2),
+        "planning_time_ms": round(plan.get("Planning Time", 0), 2),
+        "seq_scans": sorted({
+            relation_family(n["Relation Name"]) for n in nodes
+            if n["Node Type"] == "Seq Scan" and "Relation Name" in n
+        }),
+        "shared_hit_blocks": plan["Plan"].get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan["Plan"].get("Shared Read Blocks", 0),
+        "max_row_estimate_error": round(row_estimate_error(worst), 2),
+        "max_row_estimate_error_node": worst["Node Type"]
+    }
+
+
+def find_regressions(current, previous, time_regression_pct=25, row_estimate_factor=10):
+    """Flag what got worse between two plan summaries; `previous` may be None on the first run."""
+    flags = []
+    if current["max_row_estimate_error"] >= row_estimate_factor:
+        flags.append(
+            f"row estimate off by {current['max_row_estimate_error']}x at {current['max_row_estimate_error_node']}"
+        )
+    if previous is None:
+        return flags
+
+    if previous["execution_time_ms"] > 0:
+        delta_pct = (current["execution_time_ms"] - previous["execution_time_ms"]) / previous["execution_time_ms"] * 100
+        if delta_pct > time_regression_pct:
+            flags.append(
+                f"execution time up {delta_pct:.0f}% "
+                f"({previous['execution_time_ms']} -> {current['execution_time_ms']} ms)"
+            )
+    if "fact_sales" in current["seq_scans"] and "fact_sales" not in previous["seq_scans"]:
+        flags.append("new seq scan on fact_sales")
+    return flags
+
+
+# ---------- STORAGE ----------
+def plan_path(name, plan_dir=PLAN_DIR):
+    return Path(plan_dir) / f"{name}.json"
+
+
+def load_previous(name, plan_dir=PLAN_DIR):
+    path = plan_path(name, plan_dir)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)["summary"]
+
+
+def save_plan(name, plan, summary, plan_dir=PLAN_DIR):
+    path = plan_path(name, plan_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"summary": summary, "plan": plan}, f, indent=4)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import date
+from pathlib import Path
+
+CACHE_DIR = "data/cache/analytics"
+
+# Everything the analytics queries read. Every fact load and every dimension
+# load that changes rows (including in-place upserts and type 1 overwrites)
+# advances that source's batch_id in etl_watermarks; see bump_version in
+# scripts/transformation/load_warehouse.py.
+VERSION_SOURCES = ("fact_sales", "dim_customers", "dim_products", "dim_date", "dim_payment_method")
+VERSION_SQL = """
+    SELECT string_agg(source_name || ':' || batch_id, ',' ORDER BY source_name)
+    FROM warehouse.etl_watermarks
+    WHERE source_name = ANY(%s)
+"""
+
+
+def warehouse_version(conn):
+    with conn.cursor() as cur:
+        cur.execute(VERSION_SQL, (list(VERSION_SOURCES),))
+        row = cur.fetchone()
+    conn.rollback()
+    return row[0] or "empty"
+
+
+def cache_key(sql, params, version, fmt="csv"):
+    """Key for a query result; queries using CURRENT_DATE are also keyed on today's date."""
+    as_of = date.today().isoformat() if "CURRENT_DATE" in sql.upper() else None
+    payload = json.dumps(
+        {"sql": " ".join(sql.split()), "params": params, "version": version, "format": fmt, "as_of": as_of},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def meta_path(key, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f"{key}.json"
+
+
+def lookup(key, cache_dir=CACHE_DIR):
+    """Return (cached file path, metadata) for `key`, or None on a miss."""
+    path = meta_path(key, cache_dir)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        meta = json.load(f)
+    data_path = Path(cache_dir) / meta["file"]
+    if not data_path.exists():
+        return None
+    os.utime(path)  # last use drives size-based eviction
+    return data_path, meta
+
+
+def store(key, source_path, meta, cache_dir=CACHE_DIR):
+    """Copy an exported result file into the cache under `key`."""
+    data_path = Path(cache_dir) / f"{key}{Path(source_path).suffix}"
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source_path, data_path)
+    # metadata last, so a half-written entry is never treated as a hit
+    with open(meta_path(key, cache_dir), "w") as f:
+        json.dump({**meta, "file": data_path.name, "stored_at": time.time()}, f, indent=4)
+
+
+def evict(max_age_hours=None, max_size_mb=None, cache_dir=CACHE_DIR):
+    """Drop entries older than `max_age_hours`, then least recently used ones until under `max_size_mb`."""
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return 0
+
+    entries = []
+    for entry_meta in cache_dir.glob("*.json"):
+        with open(entry_meta) as f:
+            meta = json.load(f)
+        data_path = cache_dir / meta.get("file", "")
+        size = entry_meta.stat().st_size + (data_path.stat().st_size if data_path.is_file() else 0)
+        entries.append((entry_meta.stat().st_mtime, meta.get("stored_at", 0), size, entry_meta, data_path))
+    entries.sort(key=lambda e: e[0])
+
+    now = time.time()
+    total = sum(size for _, _, size, _, _ in entries)
+    evicted = 0
+    for _, stored_at, size, entry_meta, data_path in entries:
+        expired = max_age_hours is not None and now - stored_at > max_age_hours * 3600
+        oversize = max_size_mb is not None and total > max_size_mb * 1024 * 1024
+        if not (expired or oversize):
+            continue
+        entry_meta.unlink(missing_ok=True)
+        if data_path.is_file():
+            data_path.unlink()
+        total -= size
+        evicted += 1
+    return evicted
@@ -1,140 +1,229 @@
 import pandas as pd
-import random
+import numpy as np
 import json
+import multiprocessing
+import shutil
+import sys
 from faker import Faker
-from datetime import datetime, timedelta
-import yaml
+from functools import lru_cache
+from importlib.metadata import version
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
 
-fake = Faker()
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.config import load_config
+from scripts.utils.metrics import file_size, record_write, step
+from scripts.utils.table_io import concat_files, table_path, write_table
 
 # ---------- LOAD CONFIG ----------
-with open("config/config.yaml") as f:
-    config = yaml.safe_load(f)
+config = load_config()
 
 GEN_CFG = config["data_generation"]
+RAW_FORMAT = config.get("storage", {}).get("format", "csv")
 
 RAW_PATH = "data/raw"
-os.makedirs(RAW_PATH, exist_ok=True)
+SHARD_PATH = f"{RAW_PATH}/shards"
+
+TABLES = ["customers", "products", "transactions", "transaction_items"]
+
+AGE_GROUPS = ["18-25", "26-35", "36-45", "46-60", "60+"]
+PAYMENT_METHODS = ["Credit Card", "Debit Card", "UPI", "Cash on Delivery", "Net Banking"]
+CATEGORIES = {
+    "Electronics": ["Mobile", "Laptop", "Headphones"],
+    "Clothing": ["Shirt", "Jeans", "Dress"],
+    "Home & Kitchen": ["Mixer", "Pan", "Vacuum"],
+    "Books": ["Novel", "Comics", "Education"],
+    "Sports": ["Bat", "Ball", "Shoes"],
+    "Beauty": ["Cream", "Perfume", "Makeup"]
+}
+
+# ---------- FAKER VALUE POOL ----------
+POOL_FIELDS = {
+    "first_names": lambda fake: fake.first_name(),
+    "last_names": lambda fake: fake.last_name(),
+    "phones": lambda fake: fake.phone_number(),
+    "cities": lambda fake: fake.city(),
+    "states": lambda fake: fake.state(),
+    "companies": lambda fake: fake.company(),
+    "addresses": lambda fake: fake.address(),
+    "words": lambda fake: fake.word(),
+    "email_domains": lambda fake: fake.free_email_domain()
+}
+
+def build_value_pool(size, seed=None):
+    """Draw `size` Faker values per field; generators sample from these arrays."""
+    fake = Faker()
+    fake.seed_instance(seed)
+    return {field: [make(fake) for _ in range(size)] for field, make in POOL_FIELDS.items()}
+
+def load_value_pool(path, size, seed=None):
+    """Load the value pool cached at `path`, rebuilding it when size, seed or Faker changed."""
+    meta = {"size": size, "seed": seed, "faker_version": version("faker")}
+    if os.path.exists(path):
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("meta") == meta:
+            return {field: np.array(values, dtype=object) for field, values in cached["values"].items()}
+
+    values = build_value_pool(size, seed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "values": values}, f)
+    return {field: np.array(field_values, dtype=object) for field, field_values in values.items()}
+
+@lru_cache(maxsize=1)
+def default_value_pool():
+    return {field: np.array(values, dtype=object) for field, values in build_value_pool(1000, 0).items()}
+
+def sample(rng, pool, field, n):
+    values = pool[field]
+    return values[rng.integers(len(values), size=n)]
+
+def format_ids(prefix, start_id, n, width):
+    return prefix + pd.Series(np.arange(start_id, start_id + n)).astype(str).str.zfill(width)
 
 # ---------- CUSTOMERS ----------
-def generate_customers(n):
-    customers = []
-    emails = set()
-
-    for i in range(1, n + 1):
-        email = fake.email()
-        while email in emails:
-            email = fake.email()
-        emails.add(email)
-
-        customers.append({
-            "customer_id": f"CUST{i:04d}",
-            "first_name": fake.first_name(),
-            "last_name": fake.last_name(),
-            "email": email,
-            "phone": fake.phone_number(),
-            "registration_date": fake.date_between(start_date="-3y", end_date="today"),
-            "city": fake.city(),
-            "state": fake.state(),
-            "country": "India",
-            "age_group": random.choice(["18-25", "26-35", "36-45", "46-60", "60+"])
-        })
-
-    return pd.DataFrame(customers)
+def generate_customers(n, start_id=1, rng=None, pool=None, registration_end=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    pool = pool if pool is not None else default_value_pool()
+    registration_end = pd.Timestamp(registration_end or date.today())
+
+    first_names = sample(rng, pool, "first_names", n)
+    last_names = sample(rng, pool, "last_names", n)
+
+    # the numeric customer ID makes every address unique without a lookup set
+    local_part = (
+        pd.Series(first_names + "." + last_names).str.lower().str.replace(r"[^a-z.]", "", regex=True)
+        + pd.Series(np.arange(start_id, start_id + n)).astype(str)
+    )
+
+    return pd.DataFrame({
+        "customer_id": format_ids("CUST", start_id, n, 4),
+        "first_name": first_names,
+        "last_name": last_names,
+        "email": local_part + "@" + sample(rng, pool, "email_domains", n),
+        "phone": sample(rng, pool, "phones", n),
+        "registration_date": pd.Series(
+            registration_end - pd.to_timedelta(rng.integers(0, 3 * 365 + 1, size=n), unit="D")
+        ).dt.date,
+        "city": sample(rng, pool, "cities", n),
+        "state": sample(rng, pool, "states", n),
+        "country": "India",
+        "age_group": rng.choice(AGE_GROUPS, size=n)
+    })
 
 # ---------- PRODUCTS ----------
-def generate_products(n):
-    categories = {
-        "Electronics": ["Mobile", "Laptop", "Headphones"],
-        "Clothing": ["Shirt", "Jeans", "Dress"],
-        "Home & Kitchen": ["Mixer", "Pan", "Vacuum"],
-        "Books": ["Novel", "Comics", "Education"],
-        "Sports": ["Bat", "Ball", "Shoes"],
-        "Beauty": ["Cream", "Perfume", "Makeup"]
-    }
+def generate_products(n, rng=None, pool=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    pool = pool if pool is not None else default_value_pool()
 
-    products = []
-    for i in range(1, n + 1):
-        category = random.choice(list(categories.keys()))
-        sub_category = random.choice(categories[category])
-        price = round(random.uniform(200, 5000), 2)
-        cost = round(price * random.uniform(0.5, 0.8), 2)
-
-        products.append({
-            "product_id": f"PROD{i:04d}",
-            "product_name": f"{fake.word().capitalize()} {sub_category}",
-            "category": category,
-            "sub_category": sub_category,
-            "price": price,
-            "cost": cost,
-            "brand": fake.company(),
-            "stock_quantity": random.randint(10, 500),
-            "supplier_id": f"SUP{random.randint(1,50):03d}"
-        })
-
-    return pd.DataFrame(products)
+    category_names = np.array(list(CATEGORIES.keys()), dtype=object)
+    category_index = rng.integers(len(category_names), size=n)
+    sub_categories = np.array([
+        CATEGORIES[category_names[c]][int(u * len(CATEGORIES[category_names[c]]))]
+        for c, u in zip(category_index, rng.random(n))
+    ], dtype=object)
+
+    price = np.round(rng.uniform(200, 5000, size=n), 2)
+    cost = np.round(price * rng.uniform(0.5, 0.8, size=n), 2)
+
+    return pd.DataFrame({
+        "product_id": format_ids("PROD", 1, n, 4),
+        "product_name": pd.Series(sample(rng, pool, "words", n)).str.capitalize() + " " + sub_categories,
+        "category": category_names[category_index],
+        "sub_category": sub_categories,
+        "price": price,
+        "cost": cost,
+        "brand": sample(rng, pool, "companies", n),
+        "stock_quantity": rng.integers(10, 501, size=n),
+        "supplier_id": "SUP" + pd.Series(rng.integers(1, 51, size=n)).astype(str).str.zfill(3)
+    })
 
 # ---------- TRANSACTIONS ----------
-def generate_transactions(n, customer_ids):
-    transactions = []
-
-    start = datetime(2023, 1, 1)
-    for i in range(1, n + 1):
-        tx_date = start + timedelta(days=random.randint(0, 365))
-        transactions.append({
-            "transaction_id": f"TXN{i:05d}",
-            "customer_id": random.choice(customer_ids),
-            "transaction_date": tx_date.date(),
-            "transaction_time": tx_date.time(),
-            "payment_method": random.choice(
-                ["Credit Card", "Debit Card", "UPI", "Cash on Delivery", "Net Banking"]
-            ),
-            "shipping_address": fake.address(),
-            "total_amount": 0.0  # calculated later
-        })
-
-    return pd.DataFrame(transactions)
+def generate_transactions(n, customer_ids, start_id=1, rng=None, pool=None,
+                          start_date="2023-01-01", end_date="2024-01-01"):
+    rng = rng if rng is not None else np.random.default_rng()
+    pool = pool if pool is not None else default_value_pool()
+    customer_ids = np.asarray(customer_ids, dtype=object)
+
+    start = pd.Timestamp(start_date)
+    span_days = (pd.Timestamp(end_date) - start).days
+    tx_dates = pd.Series(start + pd.to_timedelta(rng.integers(0, span_days + 1, size=n), unit="D"))
+
+    return pd.DataFrame({
+        "transaction_id": format_ids("TXN", start_id, n, 5),
+        "customer_id": customer_ids[rng.integers(len(customer_ids), size=n)],
+        "transaction_date": tx_dates.dt.date,
+        "transaction_time": tx_dates.dt.time,
+        "payment_method": rng.choice(PAYMENT_METHODS, size=n),
+        "shipping_address": sample(rng, pool, "addresses", n),
+        "total_amount": 0.0  # calculated later
+    })
 
 # ---------- TRANSACTION ITEMS ----------
-def generate_transaction_items(transactions, products):
-    items = []
-    item_id = 1
-
-    product_map = products.set_index("product_id").to_dict("index")
-
-    for _, tx in transactions.iterrows():
-        item_count = random.randint(1, 5)
-        chosen_products = random.sample(list(product_map.keys()), item_count)
-
-        tx_total = 0
-        for pid in chosen_products:
-            qty = random.randint(1, 3)
-            price = product_map[pid]["price"]
-            discount = random.choice([0, 5, 10, 15])
-
-            line_total = round(qty * price * (1 - discount / 100), 2)
-            tx_total += line_total
-
-            items.append({
-                "item_id": f"ITEM{item_id:05d}",
-                "transaction_id": tx["transaction_id"],
-                "product_id": pid,
-                "quantity": qty,
-                "unit_price": price,
-                "discount_percentage": discount,
-                "line_total": line_total
-            })
-            item_id += 1
-
-        transactions.loc[
-            transactions["transaction_id"] == tx["transaction_id"],
-            "total_amount"
-        ] = round(tx_total, 2)
-
-    return pd.DataFrame(items), transactions
+MAX_ITEMS_PER_TRANSACTION = 5
+DISCOUNT_CHOICES = np.array([0, 5, 10, 15])
+
+def draw_distinct_products(rng, n_transactions, n_products, max_items):
+    """Draw `max_items` distinct product indices per transaction as an array.
+
+    Column j is drawn from the n_products - j slots not yet taken and shifted
+    past the earlier picks, which is sampling without replacement done column
+    by column instead of transaction by transaction.
+    """
+    picks = np.empty((n_transactions, max_items), dtype=np.int64)
+    for j in range(max_items):
+        draw = rng.integers(0, n_products - j, size=n_transactions)
+        taken = np.sort(picks[:, :j], axis=1)
+        for c in range(j):
+            draw += draw >= taken[:, c]
+        picks[:, j] = draw
+    return picks
+
+def generate_transaction_items(transactions, products, rng=None, item_start=1):
+    rng = rng if rng is not None else np.random.default_rng()
+
+    n_tx = len(transactions)
+    product_ids = products["product_id"].to_numpy()
+    prices = products["price"].to_numpy(dtype=float)
+    max_items = min(MAX_ITEMS_PER_TRANSACTION, len(product_ids))
+
+    # one row per transaction, one column per potential line item
+    item_counts = rng.integers(1, max_items + 1, size=n_tx)
+    picks = draw_distinct_products(rng, n_tx, len(product_ids), max_items)
+    used = np.arange(max_items) < item_counts[:, None]
+
+    tx_index = np.repeat(np.arange(n_tx), item_counts)
+    product_index = picks[used]
+    n_items = len(product_index)
+
+    qty = rng.integers(1, 4, size=n_items)
+    unit_price = prices[product_index]
+    discount = rng.choice(DISCOUNT_CHOICES, size=n_items)
+    line_total = np.round(qty * unit_price * (1 - discount / 100), 2)
+
+    items = pd.DataFrame({
+        "item_id": "ITEM" + pd.Series(np.arange(item_start, item_start + n_items)).astype(str).str.zfill(5),
+        "transaction_id": transactions["transaction_id"].to_numpy()[tx_index],
+        "product_id": product_ids[product_index],
+        "quantity": qty,
+        "unit_price": unit_price,
+        "discount_percentage": discount,
+        "line_total": line_total
+    })
+
+    transactions["total_amount"] = np.round(
+        np.bincount(tx_index, weights=line_total, minlength=n_tx), 2
+    )
+
+    return items, transactions
 
 # ---------- VALIDATION ----------
 def validate_referential_integrity(customers, products, transactions, items):
@@ -147,33 +236,133 @@ def validate_referential_integrity(customers, products, transactions, items):
         "data_quality_score": 100 if orphan_tx.empty and orphan_prod.empty else 90
     }
 
-# ---------- MAIN ----------
-def main():
-    customers = generate_customers(GEN_CFG["customers"])
-    products = generate_products(GEN_CFG["products"])
-    transactions = generate_transactions(GEN_CFG["orders"], customers["customer_id"].tolist())
-    items, transactions = generate_transaction_items(transactions, products)
+# ---------- SHARDING ----------
+def split_range(total, shards):
+    """Split IDs 1..total into `shards` contiguous (start_id, count) ranges."""
+    base, extra = divmod(total, shards)
+    ranges = []
+    start_id = 1
+    for shard_no in range(shards):
+        count = base + (1 if shard_no < extra else 0)
+        ranges.append((start_id, count))
+        start_id += count
+    return ranges
 
-    customers.to_csv(f"{RAW_PATH}/customers.csv", index=False)
-    products.to_csv(f"{RAW_PATH}/products.csv", index=False)
-    transactions.to_csv(f"{RAW_PATH}/transactions.csv", index=False)
-    items.to_csv(f"{RAW_PATH}/transaction_items.csv", index=False)
+def shard_file(table, shard_no):
+    return table_path(SHARD_PATH, f"{table}_shard{shard_no:03d}", RAW_FORMAT)
 
-    metadata = {
-        "generated_at": datetime.now().isoformat(),
+def generate_shard(shard_no, seed_seq, customer_range, transaction_range, n_customers, products, pool):
+    """Generate one shard's customers, transactions and items and write its part files.
+
+    Item IDs come from a fixed block per shard (MAX_ITEMS_PER_TRANSACTION per
+    transaction ID), so shards never need to coordinate to stay unique.
+    """
+    rng = np.random.default_rng(seed_seq)
+    customer_ids = format_ids("CUST", 1, n_customers, 4).to_numpy()
+    tx_start, tx_count = transaction_range
+
+    customers = generate_customers(
+        customer_range[1], start_id=customer_range[0], rng=rng, pool=pool,
+        registration_end=datetime.strptime(GEN_CFG["end_date"], "%Y-%m-%d").date()
+    )
+    transactions = generate_transactions(
+        tx_count, customer_ids, start_id=tx_start, rng=rng, pool=pool,
+        start_date=GEN_CFG["start_date"], end_date=GEN_CFG["end_date"]
+    )
+    items, transactions = generate_transaction_items(
+        transactions, products, rng=rng,
+        item_start=(tx_start - 1) * MAX_ITEMS_PER_TRANSACTION + 1
+    )
+
+    write_table(customers, shard_file("customers", shard_no), "customers", RAW_FORMAT)
+    write_table(transactions, shard_file("transactions", shard_no), "transactions", RAW_FORMAT)
+    write_table(items, shard_file("transaction_items", shard_no), "transaction_items", RAW_FORMAT)
+
+    return {
         "record_counts": {
             "customers": len(customers),
-            "products": len(products),
             "transactions": len(transactions),
             "transaction_items": len(items)
         },
-        "validation": validate_referential_integrity(
-            customers, products, transactions, items
-        )
+        "validation": validate_referential_integrity(customers, products, transactions, items)
+    }
+
+def merge_shard_files(table, shards):
+    """Concatenate a table's shard files into data/raw/<table>.<ext>."""
+    concat_files(
+        [shard_file(table, shard_no) for shard_no in range(shards)],
+        table_path(RAW_PATH, table, RAW_FORMAT),
+        RAW_FORMAT
+    )
+
+# ---------- MAIN ----------
+def main():
+    os.makedirs(RAW_PATH, exist_ok=True)
+    shards = GEN_CFG.get("shards", 1)
+    workers = min(GEN_CFG.get("workers") or os.cpu_count(), shards)
+    seed = GEN_CFG.get("seed")
+
+    pool_cfg = GEN_CFG.get("value_pool", {})
+    pool = load_value_pool(
+        pool_cfg.get("path", "data/cache/faker_value_pool.json"),
+        pool_cfg.get("size", 5000),
+        seed
+    )
+
+    # child 0 seeds the shared product catalogue, children 1..N seed the shards
+    product_seq, *shard_seqs = np.random.SeedSequence(seed).spawn(shards + 1)
+
+    products = generate_products(GEN_CFG["products"], np.random.default_rng(product_seq), pool)
+    write_table(products, table_path(RAW_PATH, "products", RAW_FORMAT), "products", RAW_FORMAT)
+
+    customer_ranges = split_range(GEN_CFG["customers"], shards)
+    transaction_ranges = split_range(GEN_CFG["orders"], shards)
+    shard_args = [
+        (shard_no, shard_seqs[shard_no], customer_ranges[shard_no],
+         transaction_ranges[shard_no], GEN_CFG["customers"], products, pool)
+        for shard_no in range(shards)
+    ]
+
+    os.makedirs(SHARD_PATH, exist_ok=True)
+    if workers > 1:
+        # spawn, not fork: in_process mode runs this inside the orchestrator while
+        # other DAG threads hold pool connections and locks
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(generate_shard, *zip(*shard_args)))
+    else:
+        results = [generate_shard(*args) for args in shard_args]
+
+    if GEN_CFG.get("merge_shards", True):
+        for table in ["customers", "transactions", "transaction_items"]:
+            merge_shard_files(table, shards)
+        shutil.rmtree(SHARD_PATH)
+
+    record_counts = {"products": len(products)}
+    orphans = {"orphan_transaction_items": 0, "orphan_products": 0}
+    for result in results:
+        for table, count in result["record_counts"].items():
+            record_counts[table] = record_counts.get(table, 0) + count
+        for check in orphans:
+            orphans[check] += result["validation"][check]
+
+    metadata = {
+        "generated_at": datetime.now().isoformat(),
+        "seed": seed,
+        "shards": shards,
+        "file_format": RAW_FORMAT,
+        "record_counts": {table: record_counts[table] for table in TABLES},
+        "validation": {
+            **orphans,
+            "data_quality_score": 100 if not any(orphans.values()) else 90
+        }
     }
 
     with open(f"{RAW_PATH}/generation_metadata.json", "w") as f:
         json.dump(metadata, f, indent=4)
 
+    for table in TABLES:
+        record_write(f"raw.{table}", record_counts[table], file_size(table_path(RAW_PATH, table, RAW_FORMAT)))
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with step("data_generation"):
+        main()
@@ -1,49 +1,230 @@
-import psycopg2
-import pandas as pd
 import json
 import time
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-import os
 from dotenv import load_dotenv
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[2]  # ETL_pipeline root
 load_dotenv(dotenv_path=BASE_DIR / ".env")
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.config import load_config
+from scripts.utils.db import copy_dataframe, copy_from_file, get_connection, get_pool
+from scripts.utils.metrics import bind, file_size, record_read, record_write, step
+from scripts.utils.table_io import apply_schema, iter_table, table_path
 
 DATA_PATH = "data/raw"
 SUMMARY_PATH = "data/staging/ingestion_summary.json"
 
-conn = psycopg2.connect(
-    host=os.getenv("DB_HOST"),
-    dbname=os.getenv("DB_NAME"),
-    user=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD"),
-    port=os.getenv("DB_PORT")
-)
+config = load_config()
+RAW_FORMAT = config.get("storage", {}).get("format", "csv")
+INGEST_CFG = config.get("ingestion", {})
 
 tables = ["customers", "products", "transactions", "transaction_items"]
 
-summary = {"ingestion_timestamp": datetime.now().isoformat(), "tables_loaded": {}}
-start = time.time()
-
-try:
-    with conn:
-        with conn.cursor() as cur:
-            for table in tables:
-                cur.execute(f"TRUNCATE staging.{table}")
-                df = pd.read_csv(f"{DATA_PATH}/{table}.csv")
-                df.to_sql(table, conn, schema="staging", if_exists="append", index=False)
-                summary["tables_loaded"][f"staging.{table}"] = {
-                    "rows_loaded": len(df),
-                    "status": "success"
-                }
-except Exception as e:
-    conn.rollback()
-    summary["error"] = str(e)
-finally:
-    conn.close()
-
-summary["total_execution_time_seconds"] = round(time.time() - start, 2)
-
-with open(SUMMARY_PATH, "w") as f:
-    json.dump(summary, f, indent=4)
\ No newline at end of file
+
+# ---------- COPY LOADERS ----------
+def copy_csv_file(cur, target, path):
+    """Stream a raw CSV straight into `target`; the file header names the columns."""
+    with open(path, newline="") as f:
+        columns = f.readline().strip().split(",")
+        return copy_from_file(cur, target, f, columns)
+
+
+def copy_buffered(cur, table, target, path):
+    """COPY a raw file in chunks through an in-memory buffer, typing each chunk on the way."""
+    rows = 0
+    for chunk in iter_table(path, table, RAW_FORMAT, INGEST_CFG.get("chunk_rows", 100_000)):
+        rows += copy_dataframe(cur, apply_schema(chunk, table), target)
+    return rows
+
+
+def streams_directly():
+    # columnar files always need re-encoding to CSV for COPY
+    return RAW_FORMAT == "csv" and not INGEST_CFG.get("buffered", False)
+
+
+def ingest_table(cur, table):
+    path = table_path(DATA_PATH, table, RAW_FORMAT)
+    start = time.time()
+
+    cur.execute(f"TRUNCATE staging.{table}")
+    if streams_directly():
+        rows = copy_csv_file(cur, f"staging.{table}", path)
+    else:
+        rows = copy_buffered(cur, table, f"staging.{table}", path)
+
+    duration = time.time() - start
+    record_read(f"raw.{table}", rows, file_size(path))
+    record_write(f"staging.{table}", rows)
+    return {
+        "rows_loaded": rows,
+        "execution_time_seconds": round(duration, 2),
+        "rows_per_second": round(rows / duration, 2) if duration > 0 else None,
+        "status": "success"
+    }
+
+
+def ingest_sequential(summary, pool=None):
+    conn = pool.getconn() if pool else get_connection()
+    try:
+        # one transaction: staging is either fully reloaded or left untouched
+        with conn:
+            with conn.cursor() as cur:
+                for table in tables:
+                    summary["tables_loaded"][f"staging.{table}"] = ingest_table(cur, table)
+    finally:
+        if pool:
+            pool.putconn(conn)
+        else:
+            conn.close()
+
+
+# ---------- PARALLEL LOAD ----------
+# Each table is copied into staging.<table>_load by pooled workers that commit
+# independently. Only when every chunk of every table has landed are the load
+# tables copied into staging under a single transaction, so a failed run
+# leaves staging exactly as it was. The staging tables themselves are never
+# replaced, so their grants, comments and dependent views are kept.
+def load_table(table):
+    return f"staging.{table}_load"
+
+
+def create_load_tables(cur):
+    for table in tables:
+        cur.execute(f"DROP TABLE IF EXISTS {load_table(table)}")
+        # unlogged and without indexes: it is only a landing area for the COPY
+        cur.execute(f"CREATE UNLOGGED TABLE {load_table(table)} (LIKE staging.{table} INCLUDING DEFAULTS)")
+
+
+def swap_in_load_tables(cur):
+    for table in tables:
+        cur.execute(f"TRUNCATE staging.{table}")
+        cur.execute(f"INSERT INTO staging.{table} SELECT * FROM {load_table(table)}")
+        cur.execute(f"DROP TABLE {load_table(table)}")
+
+
+def drop_load_tables(pool):
+    """Best-effort cleanup after a failed load, on a fresh connection; never raises."""
+    try:
+        conn = pool.getconn()
+    except Exception as e:
+        print(f"Could not clean up staging load tables: {e}")
+        return
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                for table in tables:
+                    cur.execute(f"DROP TABLE IF EXISTS {load_table(table)}")
+    except Exception as e:
+        print(f"Could not clean up staging load tables: {e}")
+    finally:
+        pool.putconn(conn)
+
+
+def run_pooled(pool, copy):
+    """Run copy(cur) on a pooled connection and commit it; returns (rows, start, end)."""
+    conn = pool.getconn()
+    try:
+        start = time.time()
+        with conn:
+            with conn.cursor() as cur:
+                rows = copy(cur)
+        return rows, start, time.time()
+    finally:
+        pool.putconn(conn)
+
+
+def submit_table(executor, pool, table, max_pending):
+    """Submit a table's COPY work; tables in split_tables are cut into chunks across workers."""
+    path = table_path(DATA_PATH, table, RAW_FORMAT)
+    target = load_table(table)
+
+    if table not in INGEST_CFG.get("split_tables", []):
+        if streams_directly():
+            return [executor.submit(bind(run_pooled), pool, lambda cur: copy_csv_file(cur, target, path))]
+        return [executor.submit(bind(run_pooled), pool, lambda cur: copy_buffered(cur, table, target, path))]
+
+    futures = []
+    for chunk in iter_table(path, table, RAW_FORMAT, INGEST_CFG.get("chunk_rows", 100_000)):
+        # bound the number of chunks held in memory while workers catch up
+        pending = [f for f in futures if not f.done()]
+        if len(pending) >= max_pending:
+            wait(pending, return_when=FIRST_COMPLETED)
+        chunk = apply_schema(chunk, table)
+        futures.append(executor.submit(
+            bind(run_pooled), pool, lambda cur, chunk=chunk: copy_dataframe(cur, chunk, target)
+        ))
+    return futures
+
+
+def ingest_parallel(summary, shared_pool=None):
+    workers = INGEST_CFG.get("workers", 4)
+    pool = shared_pool or get_pool(workers + 1)
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                create_load_tables(cur)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {table: submit_table(executor, pool, table, workers * 2) for table in tables}
+            results = {table: [f.result() for f in table_futures] for table, table_futures in futures.items()}
+
+        with conn:
+            with conn.cursor() as cur:
+                swap_in_load_tables(cur)
+    except Exception:
+        # `conn` may be the connection that just broke
+        drop_load_tables(pool)
+        raise
+    finally:
+        pool.putconn(conn)
+        if shared_pool is None:
+            pool.closeall()
+
+    for table, chunks in results.items():
+        rows = sum(chunk_rows for chunk_rows, _, _ in chunks)
+        duration = max(end for _, _, end in chunks) - min(start for _, start, _ in chunks)
+        record_read(f"raw.{table}", rows, file_size(table_path(DATA_PATH, table, RAW_FORMAT)))
+        record_write(f"staging.{table}", rows)
+        summary["tables_loaded"][f"staging.{table}"] = {
+            "rows_loaded": rows,
+            "chunks": len(chunks),
+            "execution_time_seconds": round(duration, 2),
+            "rows_per_second": round(rows / duration, 2) if duration > 0 else None,
+            "status": "success"
+        }
+
+
+# ---------- MAIN ----------
+def run_ingestion(pool=None):
+    """Load every raw file into staging; pass a shared `pool` to reuse its connections."""
+    mode = INGEST_CFG.get("mode", "sequential")
+    summary = {"ingestion_timestamp": datetime.now().isoformat(), "mode": mode, "tables_loaded": {}}
+    start = time.time()
+
+    try:
+        if mode == "parallel":
+            ingest_parallel(summary, pool)
+        else:
+            ingest_sequential(summary, pool)
+    except Exception as e:
+        summary["error"] = str(e)
+
+    summary["total_execution_time_seconds"] = round(time.time() - start, 2)
+
+    with open(SUMMARY_PATH, "w") as f:
+        json.dump(summary, f, indent=4)
+
+    return summary
+
+
+if __name__ == "__main__":
+    with step("ingestion"):
+        summary = run_ingestion()
+    if "error" in summary:
+        sys.exit(1)
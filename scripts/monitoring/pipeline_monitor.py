@@ -1,6 +1,14 @@
 import json
+import sys
 import psycopg2
 from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.monitoring.run_history import compare_run
 
 report = {
     "monitoring_timestamp": datetime.utcnow().isoformat(),
@@ -30,6 +38,15 @@ report["checks"]["data_quality"] = {
     "null_violations": 0
 }
 
+regressions = compare_run()
+report["checks"]["performance"] = {
+    "status": "degraded" if regressions else "ok",
+    "regressions": regressions
+}
+for r in regressions:
+    add_alert("warning", "performance",
+              f"{r['step']} {r['metric']} {r['current']} vs baseline {r['baseline']} ({r['change_pct']:+.1f}%)")
+
 report["pipeline_health"] = "healthy"
 report["overall_health_score"] = 96
 
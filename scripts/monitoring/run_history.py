@@ -0,0 +1,183 @@
+import argparse
+import json
+import sqlite3
+import statistics
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.config import load_config
+
+MONITORING_CFG = load_config().get("monitoring", {})
+HISTORY_PATH = MONITORING_CFG.get("history_path", "data/history/pipeline_history.db")
+
+# Local SQLite store (queried by sql/queries/run_history_queries.sql); it
+# keeps working when the warehouse itself is what failed.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pipeline_execution_log (
+    run_id TEXT PRIMARY KEY,
+    start_time TEXT,
+    end_time TEXT,
+    status TEXT,
+    execution_mode TEXT,
+    total_duration_seconds REAL,
+    records_processed INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS pipeline_step_log (
+    run_id TEXT REFERENCES pipeline_execution_log(run_id),
+    step_name TEXT,
+    status TEXT,
+    duration_seconds REAL,
+    records_processed INTEGER,
+    rows_per_second REAL,
+    bytes_processed INTEGER,
+    db_round_trips INTEGER,
+    peak_rss_mb REAL,
+    PRIMARY KEY (run_id, step_name)
+);
+"""
+
+
+def connect(path=HISTORY_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# ---------- RECORDING ----------
+def record_run(report, path=HISTORY_PATH):
+    """Store one pipeline_execution_report.json; re-recording the same run replaces it."""
+    run_id = report["pipeline_execution_id"]
+    steps = []
+    for name, step in report["steps_executed"].items():
+        step_metrics = step.get("metrics") or {}
+        steps.append((
+            run_id, name, step["status"], step.get("duration_seconds"),
+            step.get("records_processed"), step_metrics.get("rows_per_second"),
+            step_metrics.get("bytes_processed"), step_metrics.get("db_round_trips"),
+            step_metrics.get("peak_rss_mb")
+        ))
+
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM pipeline_step_log WHERE run_id = ?", (run_id,))
+            conn.execute("""
+                INSERT OR REPLACE INTO pipeline_execution_log
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                run_id, report.get("start_time"), report.get("end_time"), report.get("status"),
+                report.get("execution_mode"), report.get("total_duration_seconds"),
+                report.get("metrics_summary", {}).get("records_processed")
+            ))
+            conn.executemany("INSERT INTO pipeline_step_log VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", steps)
+    finally:
+        conn.close()
+
+
+# ---------- REGRESSION DETECTION ----------
+def find_regressions(conn, run_id=None, baseline_runs=7, drop_pct=20):
+    """Compare a run's steps (default: the latest run) with the median of earlier successful runs.
+
+    A step is flagged when its rows/sec fell more than `drop_pct` percent below
+    the baseline; steps that report no throughput are compared on duration.
+    Steps with no earlier successful runs are skipped.
+    """
+    if run_id is None:
+        row = conn.execute("SELECT run_id FROM pipeline_execution_log ORDER BY start_time DESC LIMIT 1").fetchone()
+        if row is None:
+            return []
+        run_id = row[0]
+
+    start_time = conn.execute(
+        "SELECT start_time FROM pipeline_execution_log WHERE run_id = ?", (run_id,)
+    ).fetchone()[0]
+    current = conn.execute("""
+        SELECT step_name, rows_per_second, duration_seconds FROM pipeline_step_log
+        WHERE run_id = ? AND status = 'success'
+    """, (run_id,)).fetchall()
+
+    regressions = []
+    for step_name, rows_per_second, duration in current:
+        history = conn.execute("""
+            SELECT s.rows_per_second, s.duration_seconds
+            FROM pipeline_step_log s
+            JOIN pipeline_execution_log r ON r.run_id = s.run_id
+            WHERE s.step_name = ? AND s.status = 'success' AND r.start_time < ?
+            ORDER BY r.start_time DESC
+            LIMIT ?
+        """, (step_name, start_time, baseline_runs)).fetchall()
+
+        baseline_rps = [rps for rps, _ in history if rps]
+        if rows_per_second and baseline_rps:
+            baseline = statistics.median(baseline_rps)
+            change_pct = (rows_per_second - baseline) / baseline * 100
+            if change_pct < -drop_pct:
+                regressions.append({
+                    "step": step_name, "metric": "rows_per_second",
+                    "current": rows_per_second, "baseline": round(baseline, 2),
+                    "change_pct": round(change_pct, 1), "baseline_runs": len(baseline_rps)
+                })
+            continue
+
+        baseline_durations = [d for _, d in history if d]
+        if duration and baseline_durations:
+            baseline = statistics.median(baseline_durations)
+            change_pct = (duration - baseline) / baseline * 100
+            # slower by the same factor that would count as a throughput drop
+            if duration > baseline / (1 - drop_pct / 100):
+                regressions.append({
+                    "step": step_name, "metric": "duration_seconds",
+                    "current": duration, "baseline": round(baseline, 2),
+                    "change_pct": round(change_pct, 1), "baseline_runs": len(baseline_durations)
+                })
+    return regressions
+
+
+def compare_run(run_id=None, baseline_runs=None, drop_pct=None, path=HISTORY_PATH):
+    conn = connect(path)
+    try:
+        return find_regressions(
+            conn, run_id,
+            baseline_runs or MONITORING_CFG.get("baseline_runs", 7),
+            drop_pct if drop_pct is not None else MONITORING_CFG.get("throughput_drop_pct", 20)
+        )
+    finally:
+        conn.close()
+
+
+# ---------- CLI ----------
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline run history")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="store a pipeline_execution_report.json")
+    record.add_argument("report", nargs="?", default="data/processed/pipeline_execution_report.json")
+
+    compare = commands.add_parser("compare", help="flag steps slower than their rolling baseline")
+    compare.add_argument("--run-id", help="run to check (default: latest)")
+    compare.add_argument("--baseline-runs", type=int, help="earlier successful runs in the baseline")
+    compare.add_argument("--threshold", type=float, help="throughput drop (%%) that counts as a regression")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        with open(args.report) as f:
+            record_run(json.load(f))
+        return
+
+    regressions = compare_run(args.run_id, args.baseline_runs, args.threshold)
+    for r in regressions:
+        print(f"REGRESSION {r['step']}: {r['metric']} {r['current']} vs baseline {r['baseline']} "
+              f"({r['change_pct']:+.1f}% over {r['baseline_runs']} runs)")
+    if not regressions:
+        print("No performance regressions.")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,163 @@
 import sys
 import time
 import json
+import argparse
 import logging
+import os
 import subprocess
 from datetime import datetime, timezone
 from pathlib import Path
 
-MAX_RETRIES = 3
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.config import load_config
+from scripts.utils.dag import critical_path, run_dag
+from scripts.utils.db import get_connection, get_pool
+from scripts.utils.table_io import table_path
+from scripts.utils import checkpoints as ckpt
+from scripts.utils import metrics
+from scripts.monitoring import run_history
+
+PIPELINE_CFG = load_config().get("pipeline", {})
+
+MAX_RETRIES = PIPELINE_CFG.get("retry_attempts", 3)
 BACKOFF = [1, 2, 4]
+TASK_TIMEOUT = 600
 
 LOG_DIR = Path("logs")
 DATA_DIR = Path("data/processed")
-LOG_DIR.mkdir(exist_ok=True)
-DATA_DIR.mkdir(exist_ok=True)
 
 RUN_ID = f"PIPE_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 LOG_FILE = LOG_DIR / f"pipeline_orchestrator_{RUN_ID}.log"
+METRICS_DIR = DATA_DIR / "metrics" / RUN_ID
 
-# Logging setup
-error_handler = logging.FileHandler(LOG_DIR / "pipeline_errors.log")
-error_handler.setLevel(logging.ERROR)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        error_handler,
-        logging.StreamHandler()
-    ]
-)
+def setup_logging():
+    LOG_DIR.mkdir(exist_ok=True)
+    DATA_DIR.mkdir(exist_ok=True)
+
+    error_handler = logging.FileHandler(LOG_DIR / "pipeline_errors.log")
+    error_handler.setLevel(logging.ERROR)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            error_handler,
+            logging.StreamHandler()
+        ]
+    )
 
 PYTHON_EXEC = sys.executable
 
-PIPELINE_STEPS = [
-    ("data_generation", [PYTHON_EXEC, "scripts/data_generation/generate_data.py"]),
-    ("ingestion", [PYTHON_EXEC, "scripts/ingestion/ingest_to_staging.py"]),
-    ("quality_checks", [PYTHON_EXEC, "scripts/quality_checks/validate_data.py"]),
-    ("warehouse", [PYTHON_EXEC, "scripts/transformation/run_warehouse_etl.py"]),
-    ("analytics", [PYTHON_EXEC, "scripts/analytics/generate_analytics.py"])
-]
+WAREHOUSE_ETL = "scripts/transformation/run_warehouse_etl.py"
+WAREHOUSE_CODE = [WAREHOUSE_ETL, "scripts/transformation/load_warehouse.py"]
+
+RAW_FORMAT = load_config().get("storage", {}).get("format", "csv")
+
+def raw_file(table):
+    return table_path("data/raw", table, RAW_FORMAT)
+
+RAW_FILES = [raw_file(table) for table in ["customers", "products", "transactions", "transaction_items"]]
+
+# Task graph: a task starts as soon as everything in depends_on has succeeded.
+# Tasks may override "retries", "backoff" (seconds per attempt) and "timeout"
+# (subprocess mode only).
+# For checkpoint/resume, a task's fingerprint covers its "config" sections,
+# the contents of its "files", the fact_sales load batch when "fact_batch" is
+# set, and the checkpoint markers of the tasks it depends on. "outputs" must
+# still match what the last successful run produced. The fact_sales load
+# itself sets "writes_fact_batch" instead: each load advances the batch, so
+# the batch it left behind is part of its marker rather than its inputs.
+# The warehouse loads read the raw files, so they only wait for data generation
+# and run alongside staging ingestion.
+PIPELINE_TASKS = {
+    "data_generation": {
+        "command": [PYTHON_EXEC, "scripts/data_generation/generate_data.py"],
+        "depends_on": [],
+        "config": ["data_generation", "storage"],
+        "files": ["scripts/data_generation/generate_data.py"],
+        "outputs": RAW_FILES + ["data/raw/generation_metadata.json"]
+    },
+    "ingestion": {
+        "command": [PYTHON_EXEC, "scripts/ingestion/ingest_to_staging.py"],
+        "depends_on": ["data_generation"],
+        "config": ["ingestion", "storage"],
+        "files": RAW_FILES + ["scripts/ingestion/ingest_to_staging.py"],
+        "outputs": ["data/staging/ingestion_summary.json"]
+    },
+    "warehouse_indexes": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "indexes"],
+        "depends_on": [],
+        "config": ["warehouse"],
+        "files": ["sql/ddl/create_warehouse_indexes.sql", "scripts/transformation/index_manager.py"]
+    },
+    "warehouse_dim_date": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "dim_date"],
+        "depends_on": ["data_generation"],
+        "config": ["warehouse"],
+        "files": [raw_file("transactions"), "config/holidays.csv", *WAREHOUSE_CODE]
+    },
+    "warehouse_dim_payment_method": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "dim_payment_method"],
+        "depends_on": [],
+        "files": WAREHOUSE_CODE
+    },
+    "warehouse_dim_customers": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "dim_customers"],
+        "depends_on": ["data_generation", "warehouse_indexes"],
+        "files": [raw_file("customers"), *WAREHOUSE_CODE]
+    },
+    "warehouse_dim_products": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "dim_products"],
+        "depends_on": ["data_generation", "warehouse_indexes"],
+        "files": [raw_file("products"), *WAREHOUSE_CODE]
+    },
+    "warehouse_fact_sales": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "fact_sales"],
+        "depends_on": ["warehouse_dim_date", "warehouse_dim_payment_method",
+                       "warehouse_dim_customers", "warehouse_dim_products"],
+        "config": ["warehouse"],
+        "files": [raw_file("transactions"), raw_file("transaction_items"), raw_file("products"), *WAREHOUSE_CODE],
+        "writes_fact_batch": True
+    },
+    "warehouse_aggregates": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "aggregates"],
+        "depends_on": ["warehouse_fact_sales"],
+        "config": ["warehouse"],
+        "files": ["scripts/transformation/load_aggregates.py"],
+        "fact_batch": True
+    },
+    "warehouse_analytics_views": {
+        "command": [PYTHON_EXEC, WAREHOUSE_ETL, "--task", "analytics_views"],
+        "depends_on": ["warehouse_fact_sales"],
+        "files": ["sql/ddl/create_analytics_views.sql", "scripts/transformation/analytics_views.py"],
+        "fact_batch": True
+    },
+    "quality_checks": {
+        "command": [PYTHON_EXEC, "scripts/quality_checks/validate_data.py"],
+        "depends_on": ["warehouse_fact_sales"],
+        "files": ["scripts/quality_checks/validate_data.py"],
+        "outputs": ["data/quality/quality_report.json"],
+        "fact_batch": True
+    },
+    "analytics": {
+        "command": [PYTHON_EXEC, "scripts/analytics/generate_analytics.py"],
+        "depends_on": ["warehouse_analytics_views"],
+        "config": ["analytics"],
+        "files": ["scripts/analytics/generate_analytics.py"],
+        "outputs": ["data/processed/analytics/analytics_summary.json"],
+        "fact_batch": True
+    }
+}
+
+PIPELINE_START = time.time()
 
 report = {
     "pipeline_execution_id": RUN_ID,
-    "start_time": datetime.now(timezone.utc).isoformat(),
+    "start_time": None,
     "steps_executed": {},
     "data_quality_summary": {
         "quality_score": None,
@@ -53,25 +167,69 @@ report = {
     "warnings": []
 }
 
+# ---------- IN-PROCESS MODE ----------
+# Stages are called directly in this interpreter: no per-step Python startup
+# or re-import of pandas/psycopg2, one warm connection pool shared by every
+# stage, and raw files read once by the warehouse tasks (run_warehouse_etl's
+# read_source cache) are reused by the later ones.
+def in_process_actions(pool):
+    from scripts.data_generation.generate_data import main as generate_data
+    from scripts.ingestion.ingest_to_staging import run_ingestion
+    from scripts.transformation import run_warehouse_etl
+    from scripts.quality_checks.validate_data import run_quality_checks
+    from scripts.analytics.generate_analytics import main as generate_analytics
+
+    run_warehouse_etl.read_source.cache_clear()
+
+    def ingestion():
+        summary = run_ingestion(pool)
+        if "error" in summary:
+            raise RuntimeError(summary["error"])
+
+    def warehouse(task):
+        return lambda: run_warehouse_etl.main([task], pool)
+
+    return {
+        "data_generation": generate_data,
+        "ingestion": ingestion,
+        "warehouse_indexes": warehouse("indexes"),
+        "warehouse_dim_date": warehouse("dim_date"),
+        "warehouse_dim_payment_method": warehouse("dim_payment_method"),
+        "warehouse_dim_customers": warehouse("dim_customers"),
+        "warehouse_dim_products": warehouse("dim_products"),
+        "warehouse_fact_sales": warehouse("fact_sales"),
+        "warehouse_aggregates": warehouse("aggregates"),
+        "warehouse_analytics_views": warehouse("analytics_views"),
+        "quality_checks": lambda: run_quality_checks(pool),
+        "analytics": lambda: generate_analytics(pool)
+    }
+
 def is_retryable_error(error_msg: str) -> bool:
     retryable_keywords = ["timeout", "connection", "temporarily unavailable"]
     return any(k in error_msg.lower() for k in retryable_keywords)
 
-def run_step(step_name, command):
-    for attempt in range(MAX_RETRIES):
+def run_step(step_name, action, retries=MAX_RETRIES, backoff=BACKOFF):
+    """Run `action()` with retries; it raises on failure (a subprocess or an in-process stage).
+
+    `action` returns the step's metrics dict (see scripts/utils/metrics.py), or None.
+    """
+    for attempt in range(retries):
         try:
             start = time.time()
             logging.info(f"Starting step: {step_name}")
 
-            subprocess.run(command, check=True, timeout=600)
+            step_metrics = action()
 
-            duration = round(time.time() - start, 2)
+            end = time.time()
 
             report["steps_executed"][step_name] = {
                 "status": "success",
-                "duration_seconds": duration,
-                "records_processed": None,
-                "retry_attempts": attempt
+                "duration_seconds": round(end - start, 2),
+                "started_at_offset_seconds": round(start - PIPELINE_START, 2),
+                "finished_at_offset_seconds": round(end - PIPELINE_START, 2),
+                "records_processed": step_metrics["records_processed"] if step_metrics else None,
+                "retry_attempts": attempt,
+                "metrics": step_metrics
             }
 
             logging.info(f"Completed step: {step_name}")
@@ -80,29 +238,182 @@ def run_step(step_name, command):
         except subprocess.TimeoutExpired:
             logging.warning(f"Timeout in {step_name}, retrying...")
 
-        except subprocess.CalledProcessError as e:
+        except Exception as e:
             logging.error(f"Error in {step_name}: {e}")
             if not is_retryable_error(str(e)):
                 logging.error("Permanent error detected. Aborting retries.")
                 break
 
-        time.sleep(BACKOFF[min(attempt, len(BACKOFF) - 1)])
+        time.sleep(backoff[min(attempt, len(backoff) - 1)])
 
     report["steps_executed"][step_name] = {
         "status": "failed",
         "error_message": f"{step_name} failed after retries",
-        "retry_attempts": MAX_RETRIES
+        "retry_attempts": retries
     }
     report["errors"].append(step_name)
     return False
 
-def main():
-    for step, cmd in PIPELINE_STEPS:
-        if not run_step(step, cmd):
-            report["status"] = "failed"
-            break
+# ---------- CHECKPOINTS ----------
+def fact_batch_id():
+    try:
+        conn = get_connection()
+    except Exception:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT batch_id FROM warehouse.etl_watermarks WHERE source_name='fact_sales'")
+            row = cur.fetchone()
+        return row[0] if row else None
+    except Exception:
+        return None
+    finally:
+        conn.close()
+
+def task_fingerprint(name, checkpoints):
+    spec = PIPELINE_TASKS[name]
+    config = load_config()
+    memo = checkpoints["file_digests"]
+    return ckpt.fingerprint({
+        "task": name,
+        "config": {section: config.get(section) for section in spec.get("config", [])},
+        "files": {path: ckpt.file_digest(path, memo) for path in spec.get("files", [])},
+        "upstream": {dep: checkpoints["tasks"].get(dep, {}).get("marker") for dep in spec["depends_on"]},
+        "fact_batch": fact_batch_id() if spec.get("fact_batch") else None
+    })
+
+def output_marker(name, checkpoints, task_fp):
+    """What downstream tasks see of this task: its output file digests, or its input fingerprint.
+
+    For the fact_sales load this includes the batch currently in the warehouse,
+    so a load run outside the pipeline since the checkpoint invalidates it.
+    """
+    spec = PIPELINE_TASKS[name]
+    outputs = spec.get("outputs")
+    if spec.get("writes_fact_batch"):
+        return ckpt.fingerprint({"inputs": task_fp, "fact_batch": fact_batch_id()})
+    if not outputs:
+        return task_fp
+    memo = checkpoints["file_digests"]
+    return ckpt.fingerprint({path: ckpt.file_digest(path, memo) for path in outputs})
+
+# ---------- STEP ACTIONS ----------
+def subprocess_action(name, spec):
+    """Run the task's command; the child reports its metrics to a per-task file."""
+    metrics_path = METRICS_DIR / f"{name}.json"
+
+    def action():
+        metrics_path.unlink(missing_ok=True)
+        env = {**os.environ, metrics.METRICS_PATH_ENV: str(metrics_path)}
+        if PIPELINE_CFG.get("trace_memory", False):
+            env[metrics.TRACE_MEMORY_ENV] = "1"
+        subprocess.run(spec["command"], check=True, timeout=spec.get("timeout", TASK_TIMEOUT), env=env)
+        if not metrics_path.exists():
+            return None
+        with open(metrics_path) as f:
+            return json.load(f)
+    return action
+
+def in_process_action(name, fn):
+    def action():
+        with metrics.step(name, PIPELINE_CFG.get("trace_memory", False)) as step_metrics:
+            fn()
+        return step_metrics.as_dict()
+    return action
+
+def summarize_metrics(steps):
+    """Pipeline totals, plus the steps ordered from lowest to highest throughput."""
+    measured = {name: step["metrics"] for name, step in steps.items() if step.get("metrics")}
+    return {
+        "records_processed": sum(m["records_processed"] for m in measured.values()),
+        "bytes_processed": sum(m["bytes_processed"] for m in measured.values()),
+        "db_round_trips": sum(m["db_round_trips"] for m in measured.values()),
+        "peak_rss_mb": max((m["peak_rss_mb"] or 0 for m in measured.values()), default=None),
+        "throughput_rows_per_second": {
+            name: m["rows_per_second"]
+            for name, m in sorted(measured.items(), key=lambda item: item[1]["rows_per_second"] or 0)
+        }
+    }
+
+def main(mode=None, resume=None):
+    global PIPELINE_START
+    setup_logging()
+    mode = mode or PIPELINE_CFG.get("execution_mode", "subprocess")
+    resume = PIPELINE_CFG.get("resume", False) if resume is None else resume
+    checkpoints = ckpt.load_checkpoints()
+
+    PIPELINE_START = time.time()
+    report["start_time"] = datetime.now(timezone.utc).isoformat()
+    report["execution_mode"] = mode
+
+    pool = None
+    if mode == "in_process":
+        pool = get_pool(PIPELINE_CFG.get("pool_size", 10))
+        actions = {name: in_process_action(name, fn) for name, fn in in_process_actions(pool).items()}
     else:
-        report["status"] = "success"
+        actions = {name: subprocess_action(name, spec) for name, spec in PIPELINE_TASKS.items()}
+
+    def run_task(name):
+        spec = PIPELINE_TASKS[name]
+        task_fp = task_fingerprint(name, checkpoints)
+        previous = checkpoints["tasks"].get(name)
+
+        if resume and previous and previous["fingerprint"] == task_fp \
+                and output_marker(name, checkpoints, task_fp) == previous["marker"]:
+            offset = round(time.time() - PIPELINE_START, 2)
+            report["steps_executed"][name] = {
+                "status": "cached",
+                "duration_seconds": 0,
+                "started_at_offset_seconds": offset,
+                "finished_at_offset_seconds": offset,
+                "checkpoint_run_id": previous["run_id"]
+            }
+            logging.info(f"Skipping step: {name} (inputs unchanged since {previous['run_id']})")
+            return True
+
+        # a failed attempt may have half-applied changes, so the old checkpoint goes first
+        ckpt.update_task(checkpoints, name, None)
+        if not run_step(
+            name, actions[name],
+            retries=spec.get("retries", MAX_RETRIES),
+            backoff=spec.get("backoff", BACKOFF)
+        ):
+            return False
+
+        ckpt.update_task(checkpoints, name, {
+            "fingerprint": task_fp,
+            "marker": output_marker(name, checkpoints, task_fp),
+            "run_id": RUN_ID,
+            "completed_at": datetime.now(timezone.utc).isoformat()
+        })
+        return True
+
+    try:
+        statuses = run_dag(PIPELINE_TASKS, run_task, PIPELINE_CFG.get("max_workers", 4))
+    finally:
+        if pool is not None:
+            pool.closeall()
+
+    for name, status in statuses.items():
+        if status == "skipped":
+            report["steps_executed"][name] = {"status": "skipped", "reason": "upstream task failed"}
+    report["status"] = "success" if all(s == "success" for s in statuses.values()) else "failed"
+    report["resumed"] = resume
+    report["steps_cached"] = [
+        name for name, step in report["steps_executed"].items() if step["status"] == "cached"
+    ]
+
+    timings = {
+        name: (step["started_at_offset_seconds"], step["finished_at_offset_seconds"])
+        for name, step in report["steps_executed"].items() if step["status"] in ("success", "cached")
+    }
+    report["metrics_summary"] = summarize_metrics(report["steps_executed"])
+
+    path = critical_path(PIPELINE_TASKS, timings)
+    report["critical_path"] = {
+        "tasks": path,
+        "duration_seconds": round(sum(timings[name][1] - timings[name][0] for name in path), 2)
+    }
 
     report["end_time"] = datetime.now(timezone.utc).isoformat()
     report["total_duration_seconds"] = (
@@ -110,10 +421,30 @@ def main():
         datetime.fromisoformat(report["start_time"])
     ).total_seconds()
 
+    # run history outlives the report file, which each run overwrites
+    try:
+        run_history.record_run(report)
+        report["performance_regressions"] = run_history.compare_run(RUN_ID)
+        for r in report["performance_regressions"]:
+            logging.warning(
+                f"Performance regression in {r['step']}: {r['metric']} {r['current']} "
+                f"vs baseline {r['baseline']} ({r['change_pct']:+.1f}%)"
+            )
+    except Exception as e:
+        logging.error(f"Could not update run history: {e}")
+
     with open(DATA_DIR / "pipeline_execution_report.json", "w") as f:
         json.dump(report, f, indent=4)
 
     logging.info("Pipeline execution finished")
+    return report
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the ETL pipeline")
+    parser.add_argument("--mode", choices=["subprocess", "in_process"],
+                        help="subprocess isolates each task; in_process shares one interpreter and "
+                             "connection pool (default: pipeline.execution_mode)")
+    parser.add_argument("--resume", action="store_true", default=None,
+                        help="skip tasks whose inputs are unchanged since their last successful run")
+    args = parser.parse_args()
+    main(args.mode, args.resume)
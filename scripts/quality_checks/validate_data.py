@@ -1,22 +1,32 @@
-import psycopg2
 import json
+import sys
 from datetime import datetime
-import os
-from dotenv import load_dotenv
 from pathlib import Path
 
-def run_quality_checks():
-    load_dotenv()
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.db import get_connection
+from scripts.utils.metrics import step
+
+def run_quality_checks(pool=None):
+    conn = pool.getconn() if pool else get_connection()
+    try:
+        with conn.cursor() as cur:
+            write_quality_report(cur)
+    finally:
+        # a pooled connection always goes back, even when a check fails
+        if pool:
+            conn.rollback()
+            pool.putconn(conn)
+        else:
+            conn.close()
+
+    print("✅ Data quality checks completed successfully.")
 
-    conn = psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD")
-    )
-    cur = conn.cursor()
 
+def write_quality_report(cur):
     Path("data/quality").mkdir(parents=True, exist_ok=True)
 
     report = {
@@ -150,11 +160,6 @@ def run_quality_checks():
     with open("data/quality/quality_report.json", "w") as f:
         json.dump(report, f, indent=4)
 
-    cur.close()
-    conn.close()
-
-    print("✅ Data quality checks completed successfully.")
-
 
 # ----------------- Additional functions for tests -----------------
 def null_checks(*args, **kwargs):
@@ -168,4 +173,5 @@ def data_consistency(*args, **kwargs):
 
 
 if __name__ == "__main__":
-    run_quality_checks()
+    with step("quality_checks"):
+        run_quality_checks()
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+VIEWS_DDL_PATH = BASE_DIR / "sql/ddl/create_analytics_views.sql"
+
+ANALYTICS_VIEWS = [
+    "warehouse.mv_monthly_trend",
+    "warehouse.mv_customer_segmentation",
+    "warehouse.mv_geographic_analysis",
+    "warehouse.mv_customer_lifetime_value"
+]
+
+
+def create_views(cur):
+    # every statement in the file is idempotent
+    cur.execute(VIEWS_DDL_PATH.read_text())
+
+
+def refresh_views(cur, concurrently=True):
+    """Create any missing view, then refresh them all; caller commits.
+
+    CONCURRENTLY keeps the views readable for analytics and BI while they
+    rebuild, but needs a populated view with a unique index, so a view that
+    has never been populated gets a plain refresh first.
+    """
+    create_views(cur)
+    refreshed = {}
+    for view in ANALYTICS_VIEWS:
+        schema, name = view.split(".")
+        cur.execute(
+            "SELECT ispopulated FROM pg_matviews WHERE schemaname=%s AND matviewname=%s",
+            (schema, name)
+        )
+        use_concurrently = concurrently and cur.fetchone()[0]
+        cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if use_concurrently else ''}{view}")
+        refreshed[view] = "concurrent" if use_concurrently else "full"
+    return refreshed
+
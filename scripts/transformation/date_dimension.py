@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pandas as pd
+
+DATE_COLUMNS = [
+    "date_key", "full_date", "year", "quarter", "month", "day", "month_name", "day_name",
+    "week_of_year", "is_weekend", "is_holiday", "year_month", "day_of_week"
+]
+
+
+def load_holidays(path):
+    """Holiday dates from a CSV with a `date` column; a missing file means no holidays."""
+    if not path or not Path(path).exists():
+        return pd.DatetimeIndex([])
+    return pd.DatetimeIndex(pd.to_datetime(pd.read_csv(path)["date"]))
+
+
+def build_dim_date(start_date, end_date, holidays=None):
+    """One dim_date row per day in [start_date, end_date], derived column-wise.
+
+    year_month ("YYYY-MM") and day_of_week (ISO, Monday=1) are stored so
+    queries can group and sort on them instead of deriving them per fact row.
+    """
+    dates = pd.date_range(start_date, end_date, freq="D")
+    holidays = holidays if holidays is not None else pd.DatetimeIndex([])
+    return pd.DataFrame({
+        "date_key": dates.year * 10000 + dates.month * 100 + dates.day,
+        "full_date": dates.date,
+        "year": dates.year,
+        "quarter": dates.quarter,
+        "month": dates.month,
+        "day": dates.day,
+        "month_name": dates.month_name(),
+        "day_name": dates.day_name(),
+        "week_of_year": dates.isocalendar().week.to_numpy(dtype="int64"),
+        "is_weekend": dates.dayofweek >= 5,
+        "is_holiday": dates.isin(holidays),
+        "year_month": dates.strftime("%Y-%m"),
+        "day_of_week": dates.dayofweek + 1
+    }, columns=DATE_COLUMNS)
@@ -0,0 +1,107 @@
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.config import load_config
+from scripts.utils.db import get_pool
+from scripts.utils.metrics import bind
+
+INDEX_DDL_PATH = BASE_DIR / "sql/ddl/create_warehouse_indexes.sql"
+SCHEMA_DDL_PATH = BASE_DIR / "sql/ddl/create_warehouse_schema.sql"
+
+INDEX_PATTERN = re.compile(
+    r"CREATE INDEX IF NOT EXISTS (\w+) ON ([\w.]+)\s*\(.*?\)[^;]*;", re.IGNORECASE | re.DOTALL
+)
+# table bodies in the schema file close with ")" at the start of a line
+TABLE_PATTERN = re.compile(r"CREATE TABLE ([\w.]+)\s*\((.*?)\n\)", re.IGNORECASE | re.DOTALL)
+FOREIGN_KEY_PATTERN = re.compile(
+    r"^\s*(\w+)\b[^,\n]*?\bCONSTRAINT (\w+) REFERENCES ([\w.]+\s*\(\w+\))", re.IGNORECASE | re.MULTILINE
+)
+
+INDEX_CFG = load_config().get("warehouse", {}).get("index_build", {})
+
+
+def load_index_definitions(path=INDEX_DDL_PATH):
+    """Parse the index DDL file into {table: {index_name: create_statement}}."""
+    definitions = {}
+    for match in INDEX_PATTERN.finditer(Path(path).read_text()):
+        definitions.setdefault(match.group(2), {})[match.group(1)] = match.group(0)
+    return definitions
+
+
+def load_foreign_keys(path=SCHEMA_DDL_PATH):
+    """Parse the named column FKs in the schema DDL into {table: {constraint: definition}}."""
+    foreign_keys = {}
+    for table in TABLE_PATTERN.finditer(Path(path).read_text()):
+        for column, constraint, target in FOREIGN_KEY_PATTERN.findall(table.group(2)):
+            foreign_keys.setdefault(table.group(1), {})[constraint] = \
+                f"FOREIGN KEY ({column}) REFERENCES {target}"
+    return foreign_keys
+
+
+# ---------- BULK LOAD ----------
+def drop_for_bulk_load(cur, table):
+    """Drop a table's managed indexes and FKs inside the caller's load transaction.
+
+    If the load rolls back, so do the drops; once it commits, call
+    rebuild_after_bulk_load to put them back.
+    """
+    schema = table.split(".")[0]
+    for constraint in load_foreign_keys().get(table, {}):
+        cur.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}")
+    for index in load_index_definitions().get(table, {}):
+        cur.execute(f"DROP INDEX IF EXISTS {schema}.{index}")
+
+
+def run_statement(pool, sql):
+    conn = pool.getconn()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            if INDEX_CFG.get("maintenance_work_mem"):
+                cur.execute("SET maintenance_work_mem = %s", (INDEX_CFG["maintenance_work_mem"],))
+            cur.execute(sql)
+    finally:
+        conn.autocommit = False
+        pool.putconn(conn)
+
+
+def rebuild_after_bulk_load(tables=None, workers=None):
+    """Create missing managed indexes in parallel, then re-add missing FKs.
+
+    Index builds on the same table only take SHARE locks and run side by side;
+    FK validation needs a stronger lock, so constraints are added one by one
+    after the indexes are in place. With `tables` left as None every managed
+    table is covered, which also creates indexes missing from older schemas.
+    """
+    definitions = load_index_definitions()
+    foreign_keys = load_foreign_keys()
+    tables = tables or sorted(set(definitions) | set(foreign_keys))
+    workers = workers or INDEX_CFG.get("workers", 4)
+
+    statements = [sql for table in tables for sql in definitions.get(table, {}).values()]
+    pool = get_pool(workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(bind(lambda sql: run_statement(pool, sql)), statements))
+
+        conn = pool.getconn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    for table in tables:
+                        for constraint, definition in foreign_keys.get(table, {}).items():
+                            cur.execute("SELECT 1 FROM pg_constraint WHERE conname=%s", (constraint,))
+                            if cur.fetchone() is None:
+                                cur.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} {definition}")
+        finally:
+            pool.putconn(conn)
+    finally:
+        pool.closeall()
+
+    print(f"Rebuilt {len(statements)} indexes on {', '.join(tables)}")
@@ -1,62 +1,139 @@
-from scripts.utils.db import get_connection
+import sys
+from pathlib import Path
 
-conn = get_connection()
-cursor = conn.cursor()
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
 
-def load_aggregates():
-    # Use global cursor and conn
-    # 1. Daily sales aggregates
-    cursor.execute("""
-        INSERT INTO warehouse.agg_daily_sales (date_key, total_transactions, total_revenue, total_profit, unique_customers)
-        SELECT
-            date_key,
-            COUNT(DISTINCT transaction_id),
-            SUM(line_total),
-            SUM(profit),
-            COUNT(DISTINCT customer_key)
-        FROM warehouse.fact_sales
-        GROUP BY date_key
-        ON CONFLICT (date_key) DO UPDATE
-        SET total_transactions = EXCLUDED.total_transactions,
-            total_revenue = EXCLUDED.total_revenue,
-            total_profit = EXCLUDED.total_profit,
-            unique_customers = EXCLUDED.unique_customers;
-    """)
+from scripts.utils.db import get_connection
+from scripts.utils.metrics import record_write
 
+# Each aggregate is grouped by a single fact_sales key. Incremental refreshes
+# delete and recompute whole groups for the keys a batch touched, so the
+# COUNT(DISTINCT ...) metrics stay exact without mergeable sketches.
+AGGREGATES = {
+    # 1. Daily sales aggregates
+    "warehouse.agg_daily_sales": {
+        "key": "date_key",
+        "columns": ["date_key", "total_transactions", "total_revenue", "total_profit", "unique_customers"],
+        "select": """
+            SELECT
+                date_key,
+                COUNT(DISTINCT transaction_id),
+                SUM(line_total),
+                SUM(profit),
+                COUNT(DISTINCT customer_key)
+            FROM warehouse.fact_sales
+            {where}
+            GROUP BY date_key
+        """
+    },
     # 2. Product performance aggregates
-    cursor.execute("""
-        INSERT INTO warehouse.agg_product_performance (product_key, total_quantity_sold, total_revenue, total_profit, avg_discount_percentage)
-        SELECT
-            product_key,
-            SUM(quantity),
-            SUM(line_total),
-            SUM(profit),
-            AVG(discount_amount * 100.0 / NULLIF(line_total,0))
-        FROM warehouse.fact_sales
-        GROUP BY product_key
-        ON CONFLICT (product_key) DO UPDATE
-        SET total_quantity_sold = EXCLUDED.total_quantity_sold,
-            total_revenue = EXCLUDED.total_revenue,
-            total_profit = EXCLUDED.total_profit,
-            avg_discount_percentage = EXCLUDED.avg_discount_percentage;
-    """)
-
+    "warehouse.agg_product_performance": {
+        "key": "product_key",
+        "columns": ["product_key", "total_quantity_sold", "total_revenue", "total_profit", "avg_discount_percentage"],
+        "select": """
+            SELECT
+                product_key,
+                SUM(quantity),
+                SUM(line_total),
+                SUM(profit),
+                AVG(discount_amount * 100.0 / NULLIF(line_total,0))
+            FROM warehouse.fact_sales
+            {where}
+            GROUP BY product_key
+        """
+    },
     # 3. Customer metrics aggregates
-    cursor.execute("""
-        INSERT INTO warehouse.agg_customer_metrics (customer_key, total_transactions, total_spent, avg_order_value, last_purchase_date)
-        SELECT
-            customer_key,
-            COUNT(DISTINCT transaction_id),
-            SUM(line_total),
-            AVG(line_total),
-            MAX(created_at)
-        FROM warehouse.fact_sales
-        GROUP BY customer_key
-        ON CONFLICT (customer_key) DO UPDATE
-        SET total_transactions = EXCLUDED.total_transactions,
-            total_spent = EXCLUDED.total_spent,
-            avg_order_value = EXCLUDED.avg_order_value,
-            last_purchase_date = EXCLUDED.last_purchase_date;
+    "warehouse.agg_customer_metrics": {
+        "key": "customer_key",
+        "columns": ["customer_key", "total_transactions", "total_spent", "avg_order_value", "last_purchase_date"],
+        "select": """
+            SELECT
+                customer_key,
+                COUNT(DISTINCT transaction_id),
+                SUM(line_total),
+                AVG(line_total),
+                MAX(created_at)
+            FROM warehouse.fact_sales
+            {where}
+            GROUP BY customer_key
+        """
+    }
+}
+
+
+def refresh_full(cur):
+    for table, agg in AGGREGATES.items():
+        cur.execute(f"TRUNCATE {table}")
+        cur.execute(f"INSERT INTO {table} ({', '.join(agg['columns'])}) " + agg["select"].format(where=""))
+        record_write(table, cur.rowcount)
+
+
+def refresh_incremental(cur, since_batch_id):
+    """Recompute only the groups touched by fact batches after `since_batch_id`.
+
+    Touched keys are those on newly loaded fact rows plus the keys of rows the
+    incremental fact load replaced, which it queues in agg_refresh_queue.
+    """
+    for table, agg in AGGREGATES.items():
+        key = agg["key"]
+        cur.execute(f"""
+            CREATE TEMP TABLE affected_keys ON COMMIT DROP AS
+            SELECT {key} AS key FROM warehouse.fact_sales WHERE batch_id > %s
+            UNION
+            SELECT {key} FROM warehouse.agg_refresh_queue
+        """, (since_batch_id,))
+        cur.execute(f"DELETE FROM {table} WHERE {key} IN (SELECT key FROM affected_keys)")
+        cur.execute(
+            f"INSERT INTO {table} ({', '.join(agg['columns'])}) "
+            + agg["select"].format(where=f"WHERE {key} IN (SELECT key FROM affected_keys)")
+        )
+        record_write(table, cur.rowcount)
+        cur.execute("DROP TABLE affected_keys")
+
+    cur.execute("DELETE FROM warehouse.agg_refresh_queue")
+
+
+def refresh_aggregates(cur, load_mode="full"):
+    """Refresh all aggregates and advance the "aggregates" watermark; caller commits.
+
+    Falls back to a full rebuild when no aggregates watermark exists yet, which
+    is also how a full fact reload forces the next refresh to be complete.
+    """
+    cur.execute("SELECT MAX(batch_id) FROM warehouse.fact_sales")
+    fact_batch_id = cur.fetchone()[0] or 0
+
+    cur.execute("""
+        SELECT batch_id FROM warehouse.etl_watermarks
+        WHERE source_name='aggregates'
+        FOR UPDATE
     """)
+    row = cur.fetchone()
+
+    if load_mode == "incremental" and row is not None:
+        refresh_incremental(cur, row[0])
+        mode = "incremental"
+    else:
+        refresh_full(cur)
+        cur.execute("DELETE FROM warehouse.agg_refresh_queue")
+        mode = "full"
+
+    cur.execute("""
+        INSERT INTO warehouse.etl_watermarks (source_name, batch_id, updated_at)
+        VALUES ('aggregates', %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (source_name) DO UPDATE
+        SET batch_id = EXCLUDED.batch_id,
+            updated_at = EXCLUDED.updated_at
+    """, (fact_batch_id,))
+    return mode
+
 
-    conn.commit()
\ No newline at end of file
+def load_aggregates(load_mode="full"):
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                return refresh_aggregates(cur, load_mode)
+    finally:
+        conn.close()
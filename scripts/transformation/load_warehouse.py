@@ -1,59 +1,88 @@
-import psycopg2
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import sys
+import threading
+from datetime import datetime
 from dotenv import load_dotenv
-import os
+from pathlib import Path
 
 load_dotenv()
 
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", 5432)
-DB_NAME = os.getenv("DB_NAME", "ecommerce_db")
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASS = os.getenv("DB_PASSWORD")
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
 
-conn = psycopg2.connect(
-    host=DB_HOST,
-    port=DB_PORT,
-    dbname=DB_NAME,
-    user=DB_USER,
-    password=DB_PASS
-)
-cursor = conn.cursor()
+from scripts.utils.config import load_config
+from scripts.utils.db import copy_dataframe, get_connection
+from scripts.utils.metrics import record_write
+from scripts.transformation.load_aggregates import refresh_aggregates
+from scripts.transformation.index_manager import drop_for_bulk_load, rebuild_after_bulk_load
+from scripts.transformation.analytics_views import refresh_views
+from scripts.transformation.date_dimension import DATE_COLUMNS, build_dim_date, load_holidays
+
+# Connection used by the loaders below; opened by connect(), not at import.
+# Each thread gets its own, so in-process warehouse tasks can run side by side.
+_local = threading.local()
+
+
+class _ThreadBound:
+    """Forwards to the connection or cursor connect() set up on the calling thread."""
+
+    def __init__(self, attr):
+        self.attr = attr
+
+    def __getattr__(self, name):
+        return getattr(getattr(_local, self.attr), name)
+
+
+conn = _ThreadBound("conn")
+cursor = _ThreadBound("cursor")
+
+WAREHOUSE_CFG = load_config().get("warehouse", {})
 
 
 # ---------------- DIM DATE ----------------
-def load_dim_date(start_date="2023-01-01", end_date="2024-12-31"):
-    start = datetime.strptime(start_date, "%Y-%m-%d").date()
-    end = datetime.strptime(end_date, "%Y-%m-%d").date()
-    current = start
-    rows = []
-
-    while current <= end:
-        rows.append((
-            int(current.strftime("%Y%m%d")),
-            current,
-            current.year,
-            (current.month - 1) // 3 + 1,
-            current.month,
-            current.day,
-            current.strftime("%B"),
-            current.strftime("%A"),
-            current.isocalendar()[1],
-            current.weekday() >= 5
-        ))
-        current += timedelta(days=1)
-
-    cursor.execute("TRUNCATE warehouse.dim_date RESTART IDENTITY CASCADE;")
-    cursor.executemany("""
-        INSERT INTO warehouse.dim_date
-        (date_key, full_date, year, quarter, month, day,
-         month_name, day_name, week_of_year, is_weekend)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """, rows)
+def load_dim_date(start_date=None, end_date=None, cover_dates=None):
+    """Extend dim_date to cover [start_date, end_date] (defaults from warehouse.date_dimension).
+
+    The range is widened to include any `cover_dates` (e.g. the transaction
+    dates about to be loaded), so fact rows always find their date key.
+
+    Dates already present are only touched when a derived attribute changed
+    (e.g. an edited holiday file), so facts referencing them are never affected.
+    """
+    date_cfg = WAREHOUSE_CFG.get("date_dimension", {})
+    start = pd.Timestamp(start_date or date_cfg.get("start_date", "2023-01-01"))
+    end = pd.Timestamp(end_date or date_cfg.get("end_date", "2024-12-31"))
+    if cover_dates is not None and len(cover_dates):
+        cover_dates = pd.to_datetime(cover_dates)
+        start, end = min(start, cover_dates.min().normalize()), max(end, cover_dates.max().normalize())
+
+    dates = build_dim_date(
+        start, end, load_holidays(BASE_DIR / date_cfg.get("holidays_file", "config/holidays.csv"))
+    )
+
+    cursor.execute("""
+        CREATE TEMP TABLE dim_date_incoming (LIKE warehouse.dim_date INCLUDING DEFAULTS)
+        ON COMMIT DROP
+    """)
+    copy_dataframe(cursor, dates, "dim_date_incoming", DATE_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO warehouse.dim_date ({', '.join(DATE_COLUMNS)})
+        SELECT {', '.join(DATE_COLUMNS)} FROM dim_date_incoming
+        ON CONFLICT (date_key) DO UPDATE
+        SET is_holiday = EXCLUDED.is_holiday,
+            year_month = EXCLUDED.year_month,
+            day_of_week = EXCLUDED.day_of_week
+        WHERE (dim_date.is_holiday, dim_date.year_month, dim_date.day_of_week)
+              IS DISTINCT FROM (EXCLUDED.is_holiday, EXCLUDED.year_month, EXCLUDED.day_of_week)
+    """)
+    changed = cursor.rowcount
+    bump_version("dim_date", changed)
 
     conn.commit()
-    print(f"Loaded {len(rows)} rows into warehouse.dim_date")
+    record_write("warehouse.dim_date", changed)
+    print(f"dim_date covers {dates['full_date'].min()} to {dates['full_date'].max()} ({changed} rows added or updated)")
 
 
 # ---------------- DIM PAYMENT METHOD ----------------
@@ -66,224 +95,414 @@ def load_dim_payment_method():
         ("Cash on Delivery", "Offline")
     ]
 
-    cursor.execute("TRUNCATE warehouse.dim_payment_method RESTART IDENTITY CASCADE;")
+    # upsert by name: keys stay stable, so fact_sales rows are never orphaned
     cursor.executemany("""
         INSERT INTO warehouse.dim_payment_method
         (payment_method_name, payment_type)
         VALUES (%s,%s)
+        ON CONFLICT (payment_method_name) DO UPDATE
+        SET payment_type = EXCLUDED.payment_type
+        WHERE dim_payment_method.payment_type IS DISTINCT FROM EXCLUDED.payment_type
     """, data)
+    bump_version("dim_payment_method", cursor.rowcount)
 
     conn.commit()
+    record_write("warehouse.dim_payment_method", len(data))
     print(f"Loaded {len(data)} rows into warehouse.dim_payment_method")
 
 
+# ---------------- SCD TYPE 2 MERGE ----------------
+def row_hash_sql(alias, tracked_columns):
+    """SQL for the stable md5 stored in row_hash, over the tracked attributes in DB types."""
+    return "md5(ROW(" + ", ".join(f"{alias}.{c}" for c in tracked_columns) + ")::text)"
+
+
+def scd2_merge(df, dim_table, key_column, business_key, tracked_columns, type1_columns=()):
+    """Merge a batch into an SCD Type 2 dimension with a fixed number of statements.
+
+    The batch is COPYed into a temp table typed like the dimension and hashed
+    the same way as the persisted row_hash column, so prices and other numerics
+    compare by their stored DB representation. Each row is classified as
+    new / changed / unchanged with an indexed lookup of the current version,
+    changed versions are expired with one UPDATE and new versions are inserted
+    with one INSERT. `type1_columns` are not versioned: they are written with
+    each new version and overwritten in place on unchanged current rows.
+    Returns the per-class row counts.
+    """
+    type1_columns = list(type1_columns)
+    columns = [business_key] + tracked_columns + type1_columns
+    column_list = ", ".join(columns)
+
+    cursor.execute(f"""
+        CREATE TEMP TABLE scd_incoming ON COMMIT DROP AS
+        SELECT {column_list} FROM {dim_table} WITH NO DATA
+    """)
+    copy_dataframe(cursor, df.drop_duplicates(business_key, keep="last"), "scd_incoming", columns)
+
+    cursor.execute(f"""
+        CREATE TEMP TABLE scd_changes ON COMMIT DROP AS
+        SELECT i.*,
+               {row_hash_sql("i", tracked_columns)} AS row_hash,
+               d.{key_column} AS current_key,
+               CASE
+                   WHEN d.{key_column} IS NULL THEN 'new'
+                   WHEN d.row_hash <> {row_hash_sql("i", tracked_columns)} THEN 'changed'
+                   ELSE 'unchanged'
+               END AS change_type
+        FROM scd_incoming i
+        LEFT JOIN {dim_table} d
+          ON d.{business_key} = i.{business_key} AND d.is_current = TRUE
+    """)
+
+    cursor.execute(f"""
+        UPDATE {dim_table} d
+        SET is_current = FALSE, end_date = CURRENT_DATE
+        FROM scd_changes c
+        WHERE d.{key_column} = c.current_key AND c.change_type = 'changed'
+    """)
+
+    cursor.execute(f"""
+        INSERT INTO {dim_table} ({column_list}, row_hash, effective_date, is_current)
+        SELECT {column_list}, row_hash, CURRENT_DATE, TRUE
+        FROM scd_changes
+        WHERE change_type IN ('new', 'changed')
+    """)
+
+    updated = 0
+    if type1_columns:
+        cursor.execute(f"""
+            UPDATE {dim_table} d
+            SET {", ".join(f"{c} = s.{c}" for c in type1_columns)}
+            FROM scd_changes s
+            WHERE d.{key_column} = s.current_key AND s.change_type = 'unchanged'
+              AND ({", ".join(f"d.{c}" for c in type1_columns)})
+                  IS DISTINCT FROM ({", ".join(f"s.{c}" for c in type1_columns)})
+        """)
+        updated = cursor.rowcount
+
+    cursor.execute("SELECT change_type, COUNT(*) FROM scd_changes GROUP BY change_type")
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    counts.update(dict(cursor.fetchall()))
+    bump_version(dim_table.split(".")[1], counts["new"] + counts["changed"] + updated)
+    record_write(dim_table, counts["new"] + counts["changed"])
+    return counts
+
+
 # ---------------- DIM CUSTOMERS (SCD TYPE 2) ----------------
 def load_dim_customers(customers_df):
-    for _, row in customers_df.iterrows():
-        full_name = f"{row['first_name']} {row['last_name']}"
-
-        cursor.execute("""
-            SELECT customer_key, full_name, email, city, state, country, age_group
-            FROM warehouse.dim_customers
-            WHERE customer_id=%s AND is_current=TRUE
-        """, (row["customer_id"],))
-
-        existing = cursor.fetchone()
-
-        if not existing:
-            cursor.execute("""
-                INSERT INTO warehouse.dim_customers
-                (customer_id, full_name, email, city, state, country,
-                 age_group, effective_date, is_current)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,CURRENT_DATE,TRUE)
-            """, (
-                row["customer_id"], full_name, row["email"].lower(),
-                row["city"], row["state"], row["country"], row["age_group"]
-            ))
-        else:
-            if existing[1:] != (
-                full_name, row["email"].lower(),
-                row["city"], row["state"], row["country"], row["age_group"]
-            ):
-                cursor.execute("""
-                    UPDATE warehouse.dim_customers
-                    SET is_current=FALSE, end_date=CURRENT_DATE
-                    WHERE customer_key=%s
-                """, (existing[0],))
-
-                cursor.execute("""
-                    INSERT INTO warehouse.dim_customers
-                    (customer_id, full_name, email, city, state, country,
-                     age_group, effective_date, is_current)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,CURRENT_DATE,TRUE)
-                """, (
-                    row["customer_id"], full_name, row["email"].lower(),
-                    row["city"], row["state"], row["country"], row["age_group"]
-                ))
+    df = pd.DataFrame({
+        "customer_id": customers_df["customer_id"],
+        "full_name": customers_df["first_name"] + " " + customers_df["last_name"],
+        "email": customers_df["email"].str.lower(),
+        "city": customers_df["city"],
+        "state": customers_df["state"],
+        "country": customers_df["country"],
+        "age_group": customers_df["age_group"],
+        "registration_date": customers_df["registration_date"]
+    })
+
+    counts = scd2_merge(
+        df, "warehouse.dim_customers", "customer_key", "customer_id",
+        ["full_name", "email", "city", "state", "country", "age_group"],
+        type1_columns=["registration_date"]
+    )
 
     conn.commit()
-    print(f"Loaded {len(customers_df)} customers into warehouse.dim_customers")
+    print(f"Loaded {len(customers_df)} customers into warehouse.dim_customers "
+          f"({counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged)")
+    return counts
 
 
 # ---------------- DIM PRODUCTS (SCD TYPE 2 + PRICE RANGE) ----------------
 def load_dim_products(products_df):
-    for _, row in products_df.iterrows():
-        price = float(row["price"])
+    price = products_df["price"].astype(float)
+
+    df = pd.DataFrame({
+        "product_id": products_df["product_id"],
+        "product_name": products_df["product_name"],
+        "category": products_df["category"],
+        "sub_category": products_df["sub_category"],
+        "brand": products_df["brand"],
+        "price": price,
+        "price_range": np.select([price < 50, price < 200], ["Budget", "Mid-range"], "Premium")
+    })
+
+    counts = scd2_merge(
+        df, "warehouse.dim_products", "product_key", "product_id",
+        ["product_name", "category", "sub_category", "brand", "price", "price_range"]
+    )
 
-        if price < 50:
-            price_range = "Budget"
-        elif price < 200:
-            price_range = "Mid-range"
-        else:
-            price_range = "Premium"
+    conn.commit()
+    print(f"Loaded {len(products_df)} products into warehouse.dim_products "
+          f"({counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged)")
+    return counts
 
-        cursor.execute("""
-            SELECT product_key, product_name, category, sub_category, brand, price, price_range
-            FROM warehouse.dim_products
-            WHERE product_id=%s AND is_current=TRUE
-        """, (row["product_id"],))
-
-        existing = cursor.fetchone()
-
-        if not existing:
-            cursor.execute("""
-                INSERT INTO warehouse.dim_products
-                (product_id, product_name, category, sub_category, brand,
-                 price, price_range, effective_date, is_current)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,CURRENT_DATE,TRUE)
-            """, (
-                row["product_id"], row["product_name"], row["category"],
-                row["sub_category"], row["brand"], price, price_range
-            ))
-        else:
-            if existing[1:] != (
-                row["product_name"], row["category"],
-                row["sub_category"], row["brand"], price, price_range
-            ):
-                cursor.execute("""
-                    UPDATE warehouse.dim_products
-                    SET is_current=FALSE, end_date=CURRENT_DATE
-                    WHERE product_key=%s
-                """, (existing[0],))
-
-                cursor.execute("""
-                    INSERT INTO warehouse.dim_products
-                    (product_id, product_name, category, sub_category, brand,
-                     price, price_range, effective_date, is_current)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,CURRENT_DATE,TRUE)
-                """, (
-                    row["product_id"], row["product_name"], row["category"],
-                    row["sub_category"], row["brand"], price, price_range
-                ))
 
+# ---------------- FACT SALES ----------------
+FACT_COLUMNS = [
+    "date_key", "customer_key", "product_key", "payment_method_key",
+    "transaction_id", "quantity", "unit_price", "discount_amount",
+    "line_total", "profit", "created_at"
+]
+
+
+def fetch_key_map(sql):
+    """Return a business-id -> surrogate-key Series from a two-column query."""
+    cursor.execute(sql)
+    rows = cursor.fetchall()
+    return pd.Series([key for _, key in rows], index=[business_id for business_id, _ in rows], dtype="Int64")
+
+
+def build_fact_sales(transactions_df, transaction_items_df, products_df,
+                     customer_map, product_map, payment_map):
+    """Build fact_sales rows with joins and whole-column arithmetic.
+
+    The key maps are Series indexed by business ID, as returned by fetch_key_map.
+    """
+    facts = transaction_items_df[["transaction_id", "product_id", "quantity",
+                                  "unit_price", "discount_percentage"]].merge(
+        transactions_df[["transaction_id", "customer_id", "transaction_date", "payment_method"]],
+        on="transaction_id", how="left", validate="many_to_one"
+    ).merge(
+        products_df[["product_id", "cost"]].drop_duplicates("product_id"),
+        on="product_id", how="left", validate="many_to_one"
+    )
+
+    facts["customer_key"] = facts["customer_id"].map(customer_map)
+    facts["product_key"] = facts["product_id"].map(product_map)
+    facts["payment_method_key"] = facts["payment_method"].map(payment_map)
+    for key in ["customer_key", "product_key", "payment_method_key"]:
+        missing = facts[key].isna().sum()
+        if missing:
+            raise ValueError(f"{missing} fact rows have no matching {key}")
+
+    quantity = facts["quantity"].astype(int)
+    gross = quantity * facts["unit_price"].astype(float)
+    discount_pct = facts["discount_percentage"].astype(float)
+    tx_date = pd.to_datetime(facts["transaction_date"])
+
+    facts["quantity"] = quantity
+    facts["unit_price"] = facts["unit_price"].astype(float)
+    facts["line_total"] = (gross * (1 - discount_pct / 100)).round(2)
+    facts["discount_amount"] = (gross * discount_pct / 100).round(2)
+    facts["profit"] = (facts["line_total"] - facts["cost"].astype(float) * quantity).round(2)
+    facts["date_key"] = tx_date.dt.year * 10000 + tx_date.dt.month * 100 + tx_date.dt.day
+    facts["created_at"] = datetime.now()
+
+    return facts[FACT_COLUMNS]
+
+
+# ---------------- FACT PARTITIONS ----------------
+# fact_sales is range-partitioned by month on date_key; month keys are YYYYMM
+# and each month lives in warehouse.fact_sales_YYYYMM.
+def fact_partition(month_key):
+    return f"warehouse.fact_sales_{month_key}"
+
+
+def ensure_fact_partitions(date_keys):
+    """Create any missing monthly partitions covering `date_keys`; returns the month keys."""
+    months = sorted({int(date_key) // 100 for date_key in date_keys})
+    for month_key in months:
+        year, month = divmod(month_key, 100)
+        next_month_key = (year + 1) * 100 + 1 if month == 12 else month_key + 1
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {fact_partition(month_key)}
+            PARTITION OF warehouse.fact_sales
+            FOR VALUES FROM ({month_key * 100 + 1}) TO ({next_month_key * 100 + 1})
+        """)
+    return months
+
+
+def truncate_fact_partitions(month_keys):
+    """Empty whole months, queueing their keys so the aggregates get recomputed."""
+    for month_key in month_keys:
+        cursor.execute(f"""
+            INSERT INTO warehouse.agg_refresh_queue (date_key, customer_key, product_key)
+            SELECT DISTINCT date_key, customer_key, product_key FROM {fact_partition(month_key)}
+        """)
+        cursor.execute(f"TRUNCATE {fact_partition(month_key)}")
+
+
+def detach_fact_partition(month_key):
+    """Detach a month from fact_sales; the table is kept for archiving or DROP."""
+    cursor.execute(f"ALTER TABLE warehouse.fact_sales DETACH PARTITION {fact_partition(month_key)}")
     conn.commit()
-    print(f"Loaded {len(products_df)} products into warehouse.dim_products")
+    print(f"Detached {fact_partition(month_key)} from warehouse.fact_sales")
 
 
-# ---------------- FACT SALES ----------------
-def load_fact_sales(transactions_df, transaction_items_df, products_df):
-    txn_map = transactions_df.set_index("transaction_id").to_dict("index")
-
-    cursor.execute("SELECT customer_id, customer_key FROM warehouse.dim_customers WHERE is_current=TRUE")
-    customer_map = dict(cursor.fetchall())
-
-    cursor.execute("SELECT product_id, product_key FROM warehouse.dim_products WHERE is_current=TRUE")
-    product_map = dict(cursor.fetchall())
-
-    cursor.execute("SELECT payment_method_name, payment_method_key FROM warehouse.dim_payment_method")
-    payment_map = dict(cursor.fetchall())
-
-    rows = []
-
-    for _, item in transaction_items_df.iterrows():
-        txn = txn_map[item["transaction_id"]]
-        quantity = int(item["quantity"])
-        unit_price = float(item["unit_price"])
-        discount_pct = float(item["discount_percentage"])
-
-        line_total = round(quantity * unit_price * (1 - discount_pct / 100), 2)
-        discount_amount = round(quantity * unit_price * discount_pct / 100, 2)
-
-        cost = float(products_df.loc[
-            products_df["product_id"] == item["product_id"], "cost"
-        ].values[0])
-
-        profit = round(line_total - (cost * quantity), 2)
-
-        rows.append((
-            int(pd.to_datetime(txn["transaction_date"]).strftime("%Y%m%d")),
-            customer_map[txn["customer_id"]],
-            product_map[item["product_id"]],
-            payment_map[txn["payment_method"]],
-            item["transaction_id"],
-            quantity,
-            unit_price,
-            discount_amount,
-            line_total,
-            profit,
-            datetime.now()
-        ))
-
-    cursor.execute("TRUNCATE warehouse.fact_sales RESTART IDENTITY;")
-    cursor.executemany("""
-        INSERT INTO warehouse.fact_sales
-        (date_key, customer_key, product_key, payment_method_key,
-         transaction_id, quantity, unit_price, discount_amount,
-         line_total, profit, created_at)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """, rows)
+# ---------------- WATERMARKS ----------------
+def get_watermark(source_name):
+    """Return (watermark_value, last batch_id) for a source, locking its control row.
+
+    The row is seeded first (NULL watermark, batch 0) so there is always a row
+    to lock: two concurrent first loads of a source then queue up too.
+    """
+    cursor.execute("""
+        INSERT INTO warehouse.etl_watermarks (source_name, watermark_value, batch_id)
+        VALUES (%s, NULL, 0)
+        ON CONFLICT (source_name) DO NOTHING
+    """, (source_name,))
+    cursor.execute("""
+        SELECT watermark_value, batch_id
+        FROM warehouse.etl_watermarks
+        WHERE source_name=%s
+        FOR UPDATE
+    """, (source_name,))
+    row = cursor.fetchone()
+    return row if row else (None, 0)
+
+
+def set_watermark(source_name, watermark_value, batch_id, rows_loaded):
+    cursor.execute("""
+        INSERT INTO warehouse.etl_watermarks
+        (source_name, watermark_value, batch_id, rows_loaded, updated_at)
+        VALUES (%s,%s,%s,%s,CURRENT_TIMESTAMP)
+        ON CONFLICT (source_name) DO UPDATE
+        SET watermark_value = EXCLUDED.watermark_value,
+            batch_id = EXCLUDED.batch_id,
+            rows_loaded = EXCLUDED.rows_loaded,
+            updated_at = EXCLUDED.updated_at
+    """, (source_name, watermark_value, batch_id, rows_loaded))
+
+
+def bump_version(source_name, rows_changed):
+    """Advance a dimension's batch_id when a load changed it, in the load's transaction.
+
+    The analytics result cache keys on these batch IDs, so in-place updates
+    (upserts, type 1 overwrites) invalidate cached results as well as new rows.
+    """
+    if rows_changed:
+        _, batch_id = get_watermark(source_name)
+        set_watermark(source_name, None, batch_id + 1, rows_changed)
+
+
+def load_fact_sales(transactions_df, transaction_items_df, products_df, load_mode=None, months=None):
+    """Load fact_sales in "full" (truncate + reload) or "incremental" mode.
+
+    Incremental loads only take transactions dated on or after the stored
+    watermark; facts for those transaction IDs are replaced, so re-delivered
+    transactions are upserted rather than duplicated. Passing `months`
+    (YYYYMM keys) instead reprocesses just those months by truncating their
+    partitions, leaving the watermark as is. Facts, the new watermark and the
+    batch ID commit in the same transaction. Returns the batch ID.
+
+    With warehouse.manage_indexes set, a full load drops the fact indexes and
+    FKs before the COPY and rebuilds them in parallel once it has committed.
+    """
+    load_mode = "months" if months else load_mode or WAREHOUSE_CFG.get("load_mode", "full")
+    manage_indexes = load_mode == "full" and WAREHOUSE_CFG.get("manage_indexes", False)
+    watermark, last_batch_id = get_watermark("fact_sales")
+    batch_id = last_batch_id + 1
+
+    tx_dates = pd.to_datetime(transactions_df["transaction_date"])
+    if months:
+        in_batch = (tx_dates.dt.year * 100 + tx_dates.dt.month).isin(months)
+        transactions_df = transactions_df[in_batch]
+        tx_dates = tx_dates[in_batch]
+        transaction_items_df = transaction_items_df[
+            transaction_items_df["transaction_id"].isin(transactions_df["transaction_id"])
+        ]
+    elif load_mode == "incremental" and watermark is not None:
+        # >= so late rows for the watermark day itself are picked up again
+        in_batch = tx_dates >= pd.Timestamp(watermark)
+        transactions_df = transactions_df[in_batch]
+        tx_dates = tx_dates[in_batch]
+        transaction_items_df = transaction_items_df[
+            transaction_items_df["transaction_id"].isin(transactions_df["transaction_id"])
+        ]
+
+    customer_map = fetch_key_map(
+        "SELECT customer_id, customer_key FROM warehouse.dim_customers WHERE is_current=TRUE")
+    product_map = fetch_key_map(
+        "SELECT product_id, product_key FROM warehouse.dim_products WHERE is_current=TRUE")
+    payment_map = fetch_key_map(
+        "SELECT payment_method_name, payment_method_key FROM warehouse.dim_payment_method")
+
+    facts = build_fact_sales(
+        transactions_df, transaction_items_df, products_df,
+        customer_map, product_map, payment_map
+    )
+
+    ensure_fact_partitions(facts["date_key"].unique())
+
+    if load_mode == "months":
+        truncate_fact_partitions(ensure_fact_partitions(m * 100 + 1 for m in months))
+    elif load_mode == "incremental":
+        cursor.execute("""
+            CREATE TEMP TABLE batch_transactions (transaction_id VARCHAR(20) PRIMARY KEY)
+            ON COMMIT DROP
+        """)
+        copy_dataframe(cursor, transactions_df[["transaction_id"]].drop_duplicates(), "batch_transactions")
+        # keys of replaced rows are queued so their aggregate groups get recomputed
+        cursor.execute("""
+            WITH removed AS (
+                DELETE FROM warehouse.fact_sales f
+                USING batch_transactions b
+                WHERE f.transaction_id = b.transaction_id
+                RETURNING f.date_key, f.customer_key, f.product_key
+            )
+            INSERT INTO warehouse.agg_refresh_queue (date_key, customer_key, product_key)
+            SELECT DISTINCT date_key, customer_key, product_key FROM removed
+        """)
+    else:
+        if manage_indexes:
+            drop_for_bulk_load(cursor, "warehouse.fact_sales")
+        cursor.execute("TRUNCATE warehouse.fact_sales RESTART IDENTITY;")
+        # aggregates can no longer be patched incrementally after a full reload
+        cursor.execute("DELETE FROM warehouse.etl_watermarks WHERE source_name='aggregates'")
+
+    rows = copy_dataframe(
+        cursor, facts.assign(batch_id=batch_id), "warehouse.fact_sales", FACT_COLUMNS + ["batch_id"]
+    )
+
+    if load_mode == "months":
+        # a reprocess covers chosen months only, so it never moves the watermark:
+        # advancing it (or setting a first one) would make the next incremental
+        # load skip every month in between
+        new_watermark = watermark
+    else:
+        new_watermark = tx_dates.max().date() if len(tx_dates) else watermark
+        if watermark is not None and load_mode != "full":
+            new_watermark = max(new_watermark, watermark)
+    set_watermark("fact_sales", new_watermark, batch_id, rows)
 
     conn.commit()
-    print(f"Loaded {len(rows)} rows into warehouse.fact_sales")
+    record_write("warehouse.fact_sales", rows)
+    print(f"Loaded {rows} rows into warehouse.fact_sales ({load_mode}, batch {batch_id})")
+
+    if manage_indexes:
+        rebuild_after_bulk_load(["warehouse.fact_sales"])
+    return batch_id
 
 
 # ---------------- AGGREGATES ----------------
-def load_aggregates():
-    cursor.execute("TRUNCATE warehouse.agg_daily_sales;")
-    cursor.execute("TRUNCATE warehouse.agg_product_performance;")
-    cursor.execute("TRUNCATE warehouse.agg_customer_metrics;")
+def load_aggregates(load_mode=None):
+    load_mode = load_mode or WAREHOUSE_CFG.get("load_mode", "full")
+    mode = refresh_aggregates(cursor, load_mode)
 
-    cursor.execute("""
-        INSERT INTO warehouse.agg_daily_sales
-        SELECT
-            date_key,
-            COUNT(DISTINCT transaction_id),
-            SUM(line_total),
-            SUM(profit),
-            COUNT(DISTINCT customer_key)
-        FROM warehouse.fact_sales
-        GROUP BY date_key;
-    """)
+    conn.commit()
+    print(f"Aggregates refreshed successfully ({mode})")
 
-    cursor.execute("""
-        INSERT INTO warehouse.agg_product_performance
-        SELECT
-            product_key,
-            SUM(quantity),
-            SUM(line_total),
-            SUM(profit),
-            AVG(discount_amount * 100.0 / NULLIF(line_total,0))
-        FROM warehouse.fact_sales
-        GROUP BY product_key;
-    """)
 
-    cursor.execute("""
-        INSERT INTO warehouse.agg_customer_metrics
-        SELECT
-            customer_key,
-            COUNT(DISTINCT transaction_id),
-            SUM(line_total),
-            AVG(line_total),
-            MAX(created_at)
-        FROM warehouse.fact_sales
-        GROUP BY customer_key;
-    """)
+# ---------------- ANALYTICS VIEWS ----------------
+def load_analytics_views():
+    refreshed = refresh_views(cursor, WAREHOUSE_CFG.get("concurrent_view_refresh", True))
 
     conn.commit()
-    print("Aggregates refreshed successfully")
+    print(f"Analytics views refreshed: {', '.join(refreshed)}")
+
+
+def connect(connection=None):
+    """Point this thread's loaders at `connection` (e.g. one borrowed from a pool), or open a new one."""
+    _local.conn = connection or get_connection()
+    _local.cursor = _local.conn.cursor()
 
 
-def close_connection():
-    cursor.close()
-    conn.close()
-    print("Database connection closed.")
\ No newline at end of file
+def close_connection(close=True):
+    """Release this thread's connection; pass close=False when it belongs to a pool."""
+    if getattr(_local, "conn", None) is None:
+        return
+    _local.cursor.close()
+    if close:
+        _local.conn.close()
+    _local.conn, _local.cursor = None, None
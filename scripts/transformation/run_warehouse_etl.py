@@ -1,43 +1,109 @@
-import pandas as pd
+import argparse
+import sys
+from functools import lru_cache
+from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
 
-from load_warehouse import (
+BASE_DIR = Path(__file__).resolve().parents[2]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from scripts.utils.config import load_config
+from scripts.utils.metrics import file_size, record_read, step
+from scripts.utils.table_io import read_table, table_path
+from scripts.transformation.index_manager import rebuild_after_bulk_load
+from scripts.transformation.load_warehouse import (
+    connect,
     load_dim_date,
     load_dim_payment_method,
     load_dim_customers,
     load_dim_products,
     load_fact_sales,
     load_aggregates,
+    load_analytics_views,
     close_connection
 )
 
+DATA_PATH = "data/raw"
+RAW_FORMAT = load_config().get("storage", {}).get("format", "csv")
+
+# Only the columns the warehouse loaders use are read from each file
+WAREHOUSE_COLUMNS = {
+    "customers": ["customer_id", "first_name", "last_name", "email",
+                  "registration_date", "city", "state", "country", "age_group"],
+    "products": ["product_id", "product_name", "category", "sub_category",
+                 "brand", "price", "cost"],
+    "transactions": ["transaction_id", "customer_id", "transaction_date", "payment_method"],
+    "transaction_items": ["transaction_id", "product_id", "quantity",
+                          "unit_price", "discount_percentage"]
+}
+
+
+# cached so a full run reads each file once; loaders never modify the frames
+@lru_cache(maxsize=None)
+def read_source(table):
+    path = table_path(DATA_PATH, table, RAW_FORMAT)
+    df = read_table(path, table, RAW_FORMAT, columns=WAREHOUSE_COLUMNS[table])
+    record_read(f"raw.{table}", len(df), file_size(path))
+    return df
+
 
-def main():
-    # ---------- READ TRANSFORMED DATA ----------
-    customers_df = pd.read_csv("data/raw/customers.csv")
-    products_df = pd.read_csv("data/raw/products.csv")
-    transactions_df = pd.read_csv("data/raw/transactions.csv")
-    transaction_items_df = pd.read_csv("data/raw/transaction_items.csv")
+# ---------- TASKS ----------
+# Each task can also run on its own (--task), which is how the orchestrator
+# schedules independent warehouse loads side by side.
+def task_indexes():
+    # creates any managed index or FK missing from the schema (no-op otherwise)
+    rebuild_after_bulk_load()
 
-    # ---------- LOAD DIMENSIONS ----------
-    load_dim_date()
-    load_dim_payment_method()
-    load_dim_customers(customers_df)
-    load_dim_products(products_df)
 
-    # ---------- LOAD FACT ----------
+def task_dim_date():
+    load_dim_date(cover_dates=read_source("transactions")["transaction_date"])
+
+
+def task_fact_sales():
     load_fact_sales(
-        transactions_df,
-        transaction_items_df,
-        products_df   #  THIS WAS MISSING
+        read_source("transactions"),
+        read_source("transaction_items"),
+        read_source("products"),
+        months=load_config().get("warehouse", {}).get("reprocess_months")
     )
 
-    # ---------- AGGREGATES ----------
-    load_aggregates()
 
-    close_connection()
+WAREHOUSE_TASKS = {
+    "indexes": task_indexes,
+    "dim_date": task_dim_date,
+    "dim_payment_method": load_dim_payment_method,
+    "dim_customers": lambda: load_dim_customers(read_source("customers")),
+    "dim_products": lambda: load_dim_products(read_source("products")),
+    "fact_sales": task_fact_sales,
+    "aggregates": load_aggregates,
+    "analytics_views": load_analytics_views
+}
+
+
+def main(tasks=None, pool=None):
+    """Run warehouse tasks in order; with a `pool`, borrow its connection instead of opening one.
+
+    load_warehouse keeps one connection per thread, so in-process callers on
+    different threads (the orchestrator's DAG workers) load side by side.
+    """
+    connection = pool.getconn() if pool else None
+    connect(connection)
+    try:
+        for task in tasks or WAREHOUSE_TASKS:
+            WAREHOUSE_TASKS[task]()
+    finally:
+        if connection is not None:
+            connection.rollback()
+        close_connection(close=pool is None)
+        if pool:
+            pool.putconn(connection)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load the warehouse from the raw files")
+    parser.add_argument("--task", action="append", choices=list(WAREHOUSE_TASKS),
+                        help="run only this task (repeatable); default runs all in order")
+    with step("warehouse"):
+        main(parser.parse_args().task)
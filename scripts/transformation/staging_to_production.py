@@ -1,6 +1,5 @@
 import os
 import psycopg2
-import pandas as pd
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,87 +14,120 @@ def get_connection():
         port=os.getenv("DB_PORT", 5432)
     )
 
-# ---------- CLEANING FUNCTIONS ----------
-def clean_text(df, cols):
-    for col in cols:
-        df[col] = df[col].astype(str).str.strip().str.title()
-    return df
-
-def standardize_email(df):
-    df['email'] = df['email'].str.lower()
-    return df
-
-def standardize_phone(df):
-    df['phone'] = df['phone'].str.replace(r'\D','', regex=True)
-    return df
-
 # ---------- LOAD DIMENSIONS ----------
+# Cleaning happens inside INSERT ... SELECT so rows never leave the database.
+# DISTINCT ON keeps the latest staged copy of a business key, and ON CONFLICT
+# makes each load idempotent against rows already in production.
 def load_customers(cur, conn):
-    df = pd.read_sql("SELECT * FROM staging.customers", conn)
-    df = clean_text(df, ['first_name','last_name','city','state','country'])
-    df = standardize_email(df)
-    df = standardize_phone(df)
-
-    cur.execute("TRUNCATE production.customers")
-    for _, row in df.iterrows():
-        cur.execute("""
-            INSERT INTO production.customers (customer_id, first_name, last_name, email, phone, registration_date)
-            VALUES (%s,%s,%s,%s,%s,%s)
-        """, (row['customer_id'], row['first_name'], row['last_name'], row['email'], row['phone'], row['registration_date']))
+    cur.execute("""
+        INSERT INTO production.customers (customer_id, first_name, last_name, email, phone,
+                                          registration_date, city, state, country, age_group)
+        SELECT DISTINCT ON (customer_id)
+            customer_id,
+            INITCAP(TRIM(first_name)),
+            INITCAP(TRIM(last_name)),
+            LOWER(TRIM(email)),
+            REGEXP_REPLACE(phone, '\\D', '', 'g'),
+            registration_date,
+            INITCAP(TRIM(city)),
+            INITCAP(TRIM(state)),
+            INITCAP(TRIM(country)),
+            age_group
+        FROM staging.customers
+        ORDER BY customer_id, loaded_at DESC
+        ON CONFLICT (customer_id) DO UPDATE
+        SET first_name = EXCLUDED.first_name,
+            last_name = EXCLUDED.last_name,
+            email = EXCLUDED.email,
+            phone = EXCLUDED.phone,
+            registration_date = EXCLUDED.registration_date,
+            city = EXCLUDED.city,
+            state = EXCLUDED.state,
+            country = EXCLUDED.country,
+            age_group = EXCLUDED.age_group
+    """)
+    rows = cur.rowcount
     conn.commit()
+    return rows
 
 def load_products(cur, conn):
-    df = pd.read_sql("SELECT * FROM staging.products", conn)
-    df['profit_margin'] = round((df['price']-df['cost'])/df['price']*100,2)
-    df['price_category'] = pd.cut(df['price'], bins=[0,50,200,10000], labels=['Budget','Mid-range','Premium'])
-    df['product_name'] = df['product_name'].str.title()
-
-    cur.execute("TRUNCATE production.products")
-    for _, row in df.iterrows():
-        cur.execute("""
-            INSERT INTO production.products (product_id, product_name, category, sub_category, price, cost, brand, stock_quantity, supplier_id)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, (row['product_id'], row['product_name'], row['category'], row['sub_category'],
-              row['price'], row['cost'], row['brand'], row['stock_quantity'], row['supplier_id']))
+    cur.execute("""
+        INSERT INTO production.products (product_id, product_name, category, sub_category, price, cost,
+                                         brand, stock_quantity, supplier_id, profit_margin, price_category)
+        SELECT DISTINCT ON (product_id)
+            product_id,
+            INITCAP(product_name),
+            category,
+            sub_category,
+            price,
+            cost,
+            brand,
+            stock_quantity,
+            supplier_id,
+            ROUND((price - cost) / NULLIF(price, 0) * 100, 2),
+            CASE
+                WHEN price <= 50 THEN 'Budget'
+                WHEN price <= 200 THEN 'Mid-range'
+                ELSE 'Premium'
+            END
+        FROM staging.products
+        ORDER BY product_id, loaded_at DESC
+        ON CONFLICT (product_id) DO UPDATE
+        SET product_name = EXCLUDED.product_name,
+            category = EXCLUDED.category,
+            sub_category = EXCLUDED.sub_category,
+            price = EXCLUDED.price,
+            cost = EXCLUDED.cost,
+            brand = EXCLUDED.brand,
+            stock_quantity = EXCLUDED.stock_quantity,
+            supplier_id = EXCLUDED.supplier_id,
+            profit_margin = EXCLUDED.profit_margin,
+            price_category = EXCLUDED.price_category
+    """)
+    rows = cur.rowcount
     conn.commit()
+    return rows
 
 # ---------- LOAD FACTS ----------
 def load_transactions(cur, conn):
-    df = pd.read_sql("SELECT * FROM staging.transactions", conn)
-    cur.execute("SELECT transaction_id FROM production.transactions")
-    existing = set([r[0] for r in cur.fetchall()])
-    df = df[~df['transaction_id'].isin(existing)]
-
-    for _, row in df.iterrows():
-        cur.execute("""
-            INSERT INTO production.transactions (transaction_id, customer_id, transaction_date, transaction_time, payment_method, total_amount)
-            VALUES (%s,%s,%s,%s,%s,%s)
-        """, (row['transaction_id'], row['customer_id'], row['transaction_date'], row['transaction_time'], row['payment_method'], row['total_amount']))
+    cur.execute("""
+        INSERT INTO production.transactions (transaction_id, customer_id, transaction_date, transaction_time,
+                                             payment_method, shipping_address, total_amount)
+        SELECT DISTINCT ON (transaction_id)
+            transaction_id, customer_id, transaction_date, transaction_time,
+            payment_method, shipping_address, total_amount
+        FROM staging.transactions
+        ORDER BY transaction_id, loaded_at DESC
+        ON CONFLICT (transaction_id) DO NOTHING
+    """)
+    rows = cur.rowcount
     conn.commit()
+    return rows
 
 def load_transaction_items(cur, conn):
-    df = pd.read_sql("SELECT * FROM staging.transaction_items", conn)
-    cur.execute("SELECT item_id FROM production.transaction_items")
-    existing = set([r[0] for r in cur.fetchall()])
-    df = df[~df['item_id'].isin(existing)]
-
-    for _, row in df.iterrows():
-        cur.execute("""
-            INSERT INTO production.transaction_items (item_id, transaction_id, product_id, quantity, unit_price, discount_percentage, line_total)
-            VALUES (%s,%s,%s,%s,%s,%s,%s)
-        """, (row['item_id'], row['transaction_id'], row['product_id'], row['quantity'],
-              row['unit_price'], row['discount_percentage'], row['line_total']))
+    cur.execute("""
+        INSERT INTO production.transaction_items (item_id, transaction_id, product_id, quantity,
+                                                  unit_price, discount_percentage, line_total)
+        SELECT DISTINCT ON (item_id)
+            item_id, transaction_id, product_id, quantity,
+            unit_price, discount_percentage, line_total
+        FROM staging.transaction_items
+        ORDER BY item_id, loaded_at DESC
+        ON CONFLICT (item_id) DO NOTHING
+    """)
+    rows = cur.rowcount
     conn.commit()
+    return rows
 
 # ---------- MAIN FUNCTION ----------
 def run_staging_to_production():
     conn = get_connection()
     cur = conn.cursor()
     try:
-        load_customers(cur, conn)
-        load_products(cur, conn)
-        load_transactions(cur, conn)
-        load_transaction_items(cur, conn)
+        print(f"Upserted {load_customers(cur, conn)} rows into production.customers")
+        print(f"Upserted {load_products(cur, conn)} rows into production.products")
+        print(f"Inserted {load_transactions(cur, conn)} new rows into production.transactions")
+        print(f"Inserted {load_transaction_items(cur, conn)} new rows into production.transaction_items")
         print("✅ Staging to Production ETL completed successfully.")
     finally:
         cur.close()
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+CHECKPOINT_PATH = "data/processed/checkpoints.json"
+
+_lock = threading.Lock()
+
+
+# ---------- FINGERPRINTS ----------
+def fingerprint(parts):
+    """Stable hash of a JSON-serialisable description of a task's inputs."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def file_digest(path, memo=None):
+    """sha256 of a file's contents, or None if it doesn't exist.
+
+    `memo` maps path -> [size, mtime_ns, digest] and is reused while a file's
+    size and mtime are unchanged, so large raw files are not re-read on every run.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = str(path)
+    if memo is not None and key in memo and memo[key][:2] == [stat.st_size, stat.st_mtime_ns]:
+        return memo[key][2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    if memo is not None:
+        with _lock:
+            memo[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return digest.hexdigest()
+
+
+# ---------- STORE ----------
+# {"tasks": {name: {"fingerprint", "marker", "run_id", "completed_at"}}, "file_digests": memo}
+def load_checkpoints(path=CHECKPOINT_PATH):
+    if not Path(path).exists():
+        return {"tasks": {}, "file_digests": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoints(checkpoints, path=CHECKPOINT_PATH):
+    # write-then-rename so a crash never leaves a truncated checkpoint file
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoints, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def update_task(checkpoints, name, entry, path=CHECKPOINT_PATH):
+    """Set (or with entry=None, invalidate) a task's checkpoint and persist it; safe across threads."""
+    with _lock:
+        if entry is None:
+            checkpoints["tasks"].pop(name, None)
+        else:
+            checkpoints["tasks"][name] = entry
+        save_checkpoints(checkpoints, path)
@@ -0,0 +1,9 @@
+import yaml
+from functools import lru_cache
+
+CONFIG_PATH = "config/config.yaml"
+
+@lru_cache(maxsize=None)
+def load_config(path=CONFIG_PATH):
+    with open(path) as f:
+        return yaml.safe_load(f)
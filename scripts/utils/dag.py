@@ -0,0 +1,84 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+# ---------- GRAPH HELPERS ----------
+def validate_dag(tasks):
+    """Check every dependency exists and the graph is acyclic; returns a topological order.
+
+    `tasks` maps task name -> spec dict with an optional "depends_on" list.
+    """
+    for name, spec in tasks.items():
+        missing = [dep for dep in spec.get("depends_on", []) if dep not in tasks]
+        if missing:
+            raise ValueError(f"Task {name} depends on unknown task(s): {', '.join(missing)}")
+
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dep in tasks[name].get("depends_on", []):
+            visit(dep, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in tasks:
+        visit(name, [])
+    return order
+
+
+def critical_path(tasks, timings):
+    """The chain of tasks that determined the end-to-end duration.
+
+    `timings` maps task name -> (start, end) offsets for tasks that ran.
+    Starting from the task that finished last, repeatedly step back to the
+    dependency that finished last, i.e. the one it was actually waiting on.
+    """
+    if not timings:
+        return []
+    path = [max(timings, key=lambda name: timings[name][1])]
+    while True:
+        deps = [dep for dep in tasks[path[-1]].get("depends_on", []) if dep in timings]
+        if not deps:
+            break
+        path.append(max(deps, key=lambda dep: timings[dep][1]))
+    return path[::-1]
+
+
+# ---------- SCHEDULER ----------
+def run_dag(tasks, run_task, max_workers):
+    """Run `run_task(name)` for every task once its dependencies succeeded.
+
+    Up to `max_workers` ready tasks run at once. `run_task` returns True on
+    success; tasks downstream of a failure are not started. Returns
+    {name: "success" | "failed" | "skipped"}.
+    """
+    validate_dag(tasks)
+    status = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(status) < len(tasks):
+            for name, spec in tasks.items():
+                if name in status or name in running.values():
+                    continue
+                deps = spec.get("depends_on", [])
+                if any(status.get(dep) in ("failed", "skipped") for dep in deps):
+                    status[name] = "skipped"
+                elif all(status.get(dep) == "success" for dep in deps) and len(running) < max_workers:
+                    running[executor.submit(run_task, name)] = name
+
+            if not running:
+                continue  # only skips were recorded this round; rescan for their dependents
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    status[name] = "success" if future.result() else "failed"
+                except Exception:
+                    status[name] = "failed"
+    return status
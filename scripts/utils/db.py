@@ -0,0 +1,70 @@
+import io
+import os
+import threading
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+from scripts.utils.metrics import CountingCursor
+
+load_dotenv()
+
+# ---------- CONNECTION HELPER ----------
+def connection_params():
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "dbname": os.getenv("DB_NAME", "ecommerce_db"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "password"),
+        "port": os.getenv("DB_PORT", 5432)
+    }
+
+def get_connection():
+    return psycopg2.connect(cursor_factory=CountingCursor, **connection_params())
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool whose getconn() waits for a free connection instead of raising."""
+
+    def __init__(self, min_connections, max_connections, **kwargs):
+        super().__init__(min_connections, max_connections, **kwargs)
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def getconn(self, key=None):
+        self._slots.acquire()
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._slots.release()
+
+def get_pool(max_connections, min_connections=1):
+    """Bounded, thread-safe pool; callers getconn()/putconn() around each unit of work.
+
+    The pool can be shared between stages running in one process, so callers
+    beyond `max_connections` wait for a connection rather than failing.
+    """
+    return BlockingConnectionPool(
+        min_connections, max_connections, cursor_factory=CountingCursor, **connection_params()
+    )
+
+# ---------- BULK COPY ----------
+def copy_from_file(cur, table, file_obj, columns, header=False):
+    """Stream a CSV file object into `table` with COPY FROM STDIN; returns rows copied."""
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN "
+        f"WITH (FORMAT csv, HEADER {'true' if header else 'false'})",
+        file_obj
+    )
+    return cur.rowcount
+
+def copy_dataframe(cur, df, table, columns=None):
+    """COPY a DataFrame into `table` through an in-memory CSV buffer; returns rows copied."""
+    columns = list(columns) if columns is not None else list(df.columns)
+    buffer = io.StringIO()
+    df[columns].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    return copy_from_file(cur, table, buffer, columns)
@@ -0,0 +1,159 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from psycopg2.extensions import cursor as _cursor
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Set by the orchestrator for subprocess steps: the step writes its metrics here on exit
+METRICS_PATH_ENV = "PIPELINE_METRICS_PATH"
+TRACE_MEMORY_ENV = "PIPELINE_TRACE_MEMORY"
+
+_current = contextvars.ContextVar("pipeline_step_metrics", default=None)
+
+
+class StepMetrics:
+    """Counters for one pipeline step; stages report into whichever step is current."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_read = {}
+        self.rows_written = {}
+        self.bytes_processed = 0
+        self.db_round_trips = 0
+        self.started = time.time()
+        self.duration = None
+        self.peak_rss_mb = None
+        self.peak_traced_mb = None
+        # stages report from worker threads (see bind)
+        self.lock = threading.Lock()
+
+    def as_dict(self):
+        rows = sum(self.rows_written.values()) or sum(self.rows_read.values())
+        duration = self.duration if self.duration is not None else time.time() - self.started
+        return {
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "records_processed": rows,
+            "bytes_processed": self.bytes_processed,
+            "rows_per_second": round(rows / duration, 2) if duration > 0 and rows else None,
+            "db_round_trips": self.db_round_trips,
+            "peak_rss_mb": self.peak_rss_mb,
+            "peak_traced_mb": self.peak_traced_mb,
+            "duration_seconds": round(duration, 2)
+        }
+
+
+# ---------- REPORTING API ----------
+# All record_* calls are no-ops outside a step, so stages run unchanged on their own.
+def record_read(table, rows, nbytes=0):
+    metrics = _current.get()
+    if metrics is not None:
+        with metrics.lock:
+            metrics.rows_read[table] = metrics.rows_read.get(table, 0) + int(rows)
+            metrics.bytes_processed += int(nbytes)
+
+
+def record_write(table, rows, nbytes=0):
+    metrics = _current.get()
+    if metrics is not None:
+        with metrics.lock:
+            metrics.rows_written[table] = metrics.rows_written.get(table, 0) + int(rows)
+            metrics.bytes_processed += int(nbytes)
+
+
+def record_round_trips(count=1):
+    metrics = _current.get()
+    if metrics is not None:
+        with metrics.lock:
+            metrics.db_round_trips += count
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def bind(fn):
+    """Wrap `fn` so it reports into the current step when run on a worker thread."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+@contextmanager
+def step(name, trace_memory=None):
+    """Collect metrics for the code in the block; yields the StepMetrics.
+
+    Under the orchestrator's subprocess mode (PIPELINE_METRICS_PATH set) the
+    result is also written to that file for the orchestrator to pick up.
+    Peak RSS is per process, so for concurrent in-process steps it is the
+    process peak observed by the end of the step.
+    """
+    if trace_memory is None:
+        trace_memory = os.getenv(TRACE_MEMORY_ENV) == "1"
+    metrics = StepMetrics(name)
+    token = _current.set(metrics)
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        yield metrics
+    finally:
+        metrics.duration = time.time() - metrics.started
+        metrics.peak_rss_mb = peak_rss_mb()
+        if tracing:
+            metrics.peak_traced_mb = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            tracemalloc.stop()
+        _current.reset(token)
+
+        export_path = os.getenv(METRICS_PATH_ENV)
+        if export_path:
+            Path(export_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(export_path, "w") as f:
+                json.dump(metrics.as_dict(), f, indent=4)
+
+
+# ---------- DB ROUND TRIPS ----------
+class CountingCursor(_cursor):
+    """psycopg2 cursor that counts statements (and server-side cursor fetches) as round trips."""
+
+    def execute(self, query, vars=None):
+        record_round_trips()
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        record_round_trips(len(vars_list))
+        return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        record_round_trips()
+        return super().copy_expert(sql, file, size)
+
+    def fetchmany(self, size=None):
+        if self.name:
+            record_round_trips()
+        return super().fetchmany(size) if size is not None else super().fetchmany()
+
+    def fetchall(self):
+        if self.name:
+            record_round_trips()
+        return super().fetchall()
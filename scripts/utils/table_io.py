@@ -0,0 +1,153 @@
+import shutil
+import pandas as pd
+
+# ---------- FORMATS ----------
+# "arrow" and "feather" are the same Arrow IPC file format on disk
+FILE_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "feather": "feather", "arrow": "feather"}
+
+# ---------- TABLE SCHEMAS ----------
+# Column order and dtypes shared by every stage that writes or reads data/raw.
+# "date" columns are held as datetime64 in pandas (written as YYYY-MM-DD in CSV).
+TABLE_SCHEMAS = {
+    "customers": {
+        "customer_id": "string",
+        "first_name": "string",
+        "last_name": "string",
+        "email": "string",
+        "phone": "string",
+        "registration_date": "date",
+        "city": "string",
+        "state": "string",
+        "country": "string",
+        "age_group": "string"
+    },
+    "products": {
+        "product_id": "string",
+        "product_name": "string",
+        "category": "string",
+        "sub_category": "string",
+        "price": "float64",
+        "cost": "float64",
+        "brand": "string",
+        "stock_quantity": "int64",
+        "supplier_id": "string"
+    },
+    "transactions": {
+        "transaction_id": "string",
+        "customer_id": "string",
+        "transaction_date": "date",
+        "transaction_time": "string",
+        "payment_method": "string",
+        "shipping_address": "string",
+        "total_amount": "float64"
+    },
+    "transaction_items": {
+        "item_id": "string",
+        "transaction_id": "string",
+        "product_id": "string",
+        "quantity": "int64",
+        "unit_price": "float64",
+        "discount_percentage": "int64",
+        "line_total": "float64"
+    }
+}
+
+def table_path(base_path, table, fmt="csv"):
+    return f"{base_path}/{table}.{FILE_EXTENSIONS[fmt]}"
+
+def apply_schema(df, table):
+    """Return `df` with the table's columns in schema order and cast to schema dtypes."""
+    schema = TABLE_SCHEMAS[table]
+    out = df[[col for col in schema if col in df.columns]].copy()
+    for col in out.columns:
+        if schema[col] == "date":
+            out[col] = pd.to_datetime(out[col])
+        else:
+            out[col] = out[col].astype(schema[col])
+    return out
+
+# ---------- WRITE ----------
+def write_table(df, path, table, fmt="csv"):
+    df = apply_schema(df, table)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt in ("feather", "arrow"):
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Unsupported file format: {fmt}")
+
+def concat_files(part_paths, path, fmt="csv"):
+    """Concatenate same-schema part files into one file without loading them all at once."""
+    if fmt == "csv":
+        with open(path, "w", newline="") as out:
+            for i, part_path in enumerate(part_paths):
+                with open(part_path, newline="") as part:
+                    header = part.readline()
+                    if i == 0:
+                        out.write(header)
+                    shutil.copyfileobj(part, out)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = None
+        for part_path in part_paths:
+            part = pq.read_table(part_path)
+            writer = writer or pq.ParquetWriter(path, part.schema)
+            writer.write_table(part)
+        writer.close()
+    elif fmt in ("feather", "arrow"):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        writer = None
+        for part_path in part_paths:
+            part = feather.read_table(part_path)
+            writer = writer or pa.ipc.new_file(path, part.schema)
+            writer.write_table(part)
+        writer.close()
+    else:
+        raise ValueError(f"Unsupported file format: {fmt}")
+
+# ---------- READ ----------
+def read_table(path, table, fmt="csv", columns=None):
+    """Read a data/raw table with explicit dtypes, loading only `columns` when given."""
+    schema = TABLE_SCHEMAS[table]
+    columns = list(columns) if columns is not None else list(schema)
+    if fmt == "csv":
+        df = pd.read_csv(
+            path,
+            usecols=columns,
+            dtype={col: schema[col] for col in columns if schema[col] != "date"},
+            parse_dates=[col for col in columns if schema[col] == "date"]
+        )
+    elif fmt == "parquet":
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt in ("feather", "arrow"):
+        df = pd.read_feather(path, columns=columns)
+    else:
+        raise ValueError(f"Unsupported file format: {fmt}")
+    return df[columns]
+
+def iter_table(path, table, fmt="csv", chunk_rows=100_000):
+    """Yield a table file as typed DataFrame chunks of at most `chunk_rows` rows."""
+    schema = TABLE_SCHEMAS[table]
+    if fmt == "csv":
+        yield from pd.read_csv(
+            path,
+            chunksize=chunk_rows,
+            dtype={col: dtype for col, dtype in schema.items() if dtype != "date"},
+            parse_dates=[col for col, dtype in schema.items() if dtype == "date"]
+        )
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield apply_schema(batch.to_pandas(), table)
+    elif fmt in ("feather", "arrow"):
+        import pyarrow as pa
+        reader = pa.ipc.open_file(path)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield apply_schema(batch.slice(offset, chunk_rows).to_pandas(), table)
+    else:
+        raise ValueError(f"Unsupported file format: {fmt}")
@@ -23,4 +23,12 @@ CREATE TABLE IF NOT EXISTS warehouse.agg_customer_metrics (
     total_spent DECIMAL(12,2),
     avg_order_value DECIMAL(12,2),
     last_purchase_date DATE
+);
+
+-- Keys of fact rows replaced by incremental loads, pending aggregate refresh
+CREATE TABLE IF NOT EXISTS warehouse.agg_refresh_queue (
+    date_key INT,
+    customer_key INT,
+    product_key INT,
+    queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
\ No newline at end of file
@@ -0,0 +1,76 @@
+-- Materialized views behind the heavier analytics queries and the BI dashboards.
+-- Refreshed by the warehouse ETL after each load (see analytics_views.py); each
+-- has a unique index so it can be refreshed CONCURRENTLY without blocking readers.
+
+-- 1. Monthly revenue trend (query2_monthly_trend)
+CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse.mv_monthly_trend AS
+SELECT d.year_month,
+       SUM(f.line_total) AS total_revenue,
+       COUNT(DISTINCT f.transaction_id) AS total_transactions,
+       ROUND(SUM(f.line_total)/COUNT(DISTINCT f.transaction_id),2) AS avg_order_value,
+       COUNT(DISTINCT f.customer_key) AS unique_customers
+FROM warehouse.fact_sales f
+JOIN warehouse.dim_date d
+  ON f.date_key = d.date_key
+GROUP BY d.year_month;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_monthly_trend ON warehouse.mv_monthly_trend(year_month);
+
+-- 2. Customer spending segments (query3_customer_segmentation)
+CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse.mv_customer_segmentation AS
+WITH customer_totals AS (
+    SELECT f.customer_key,
+           SUM(f.line_total) AS total_spent,
+           AVG(f.line_total) AS avg_transaction_value
+    FROM warehouse.fact_sales f
+    GROUP BY f.customer_key
+)
+SELECT CASE
+           WHEN total_spent <= 1000 THEN '$0-$1,000'
+           WHEN total_spent <= 5000 THEN '$1,000-$5,000'
+           WHEN total_spent <= 10000 THEN '$5,000-$10,000'
+           ELSE '$10,000+'
+       END AS spending_segment,
+       COUNT(*) AS customer_count,
+       SUM(total_spent) AS total_revenue,
+       ROUND(AVG(avg_transaction_value),2) AS avg_transaction_value
+FROM customer_totals
+GROUP BY spending_segment;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_customer_segmentation
+    ON warehouse.mv_customer_segmentation(spending_segment);
+
+-- 3. Revenue by state (query6_geographic_analysis)
+CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse.mv_geographic_analysis AS
+SELECT c.state,
+       SUM(f.line_total) AS total_revenue,
+       COUNT(DISTINCT f.customer_key) AS total_customers,
+       ROUND(SUM(f.line_total)/COUNT(DISTINCT f.customer_key),2) AS avg_revenue_per_customer
+FROM warehouse.fact_sales f
+JOIN warehouse.dim_customers c
+  ON f.customer_key = c.customer_key
+GROUP BY c.state;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_geographic_analysis ON warehouse.mv_geographic_analysis(state);
+
+-- 4. Customer lifetime value (query7_customer_lifetime_value)
+-- One row per customer, named by its current dim_customers version, so the
+-- unique index has a non-null key and REFRESH ... CONCURRENTLY can match rows.
+-- registration_date is kept instead of days_since_registration, which depends on
+-- CURRENT_DATE and is computed when the view is read
+CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse.mv_customer_lifetime_value AS
+SELECT cur.customer_id,
+       cur.full_name,
+       cur.registration_date,
+       SUM(f.line_total) AS total_spent,
+       COUNT(DISTINCT f.transaction_id) AS transaction_count,
+       ROUND(SUM(f.line_total)/COUNT(DISTINCT f.transaction_id),2) AS avg_order_value
+FROM warehouse.fact_sales f
+JOIN warehouse.dim_customers c
+  ON f.customer_key = c.customer_key
+JOIN warehouse.dim_customers cur
+  ON cur.customer_id = c.customer_id AND cur.is_current
+GROUP BY cur.customer_id, cur.full_name, cur.registration_date;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_customer_lifetime_value
+    ON warehouse.mv_customer_lifetime_value(customer_id);
@@ -22,6 +22,8 @@ CREATE TABLE production.products (
     brand VARCHAR(100),
     stock_quantity INTEGER CHECK (stock_quantity > 0),
     supplier_id VARCHAR(20),
+    profit_margin DECIMAL(6,2),
+    price_category VARCHAR(20),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
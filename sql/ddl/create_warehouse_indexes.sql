@@ -0,0 +1,16 @@
+-- Secondary indexes on warehouse tables.
+-- Managed by scripts/transformation/index_manager.py, which drops the
+-- fact_sales ones before a full reload and rebuilds them in parallel after.
+-- Every statement is idempotent, so the file can be re-run at any time.
+
+-- fact_sales (declared on the partitioned parent; each partition gets a copy)
+CREATE INDEX IF NOT EXISTS idx_fact_sales_date ON warehouse.fact_sales(date_key);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_customer ON warehouse.fact_sales(customer_key);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_product ON warehouse.fact_sales(product_key);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_payment_method ON warehouse.fact_sales(payment_method_key);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_transaction ON warehouse.fact_sales(transaction_id);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_batch ON warehouse.fact_sales(batch_id);
+
+-- Current-version dimension lookups (SCD2 merge, fact key maps) use the
+-- composite idx_dim_customers_current / idx_dim_products_current indexes
+-- declared in create_warehouse_schema.sql.
@@ -12,13 +12,15 @@ CREATE TABLE warehouse.dim_date(
     day_name VARCHAR(20),
     week_of_year INT,
     is_weekend BOOLEAN,
-    is_holiday BOOLEAN
+    is_holiday BOOLEAN,
+    year_month CHAR(7),
+    day_of_week INT
 );
 
 -- dim_payment_method
 CREATE TABLE warehouse.dim_payment_method(
     payment_method_key SERIAL PRIMARY KEY,
-    payment_method_name VARCHAR(30),
+    payment_method_name VARCHAR(30) UNIQUE,
     payment_type VARCHAR(20)
 );
 
@@ -34,11 +36,21 @@ CREATE TABLE warehouse.dim_customers(
     age_group VARCHAR(20),
     customer_segment VARCHAR(20),
     registration_date DATE,
+    row_hash CHAR(32),
     effective_date DATE,
     end_date DATE,
     is_current BOOLEAN
 );
 
+CREATE INDEX idx_dim_customers_current ON warehouse.dim_customers(customer_id, is_current);
+
+-- Warehouses created before row_hash: add it and hash the current versions once,
+-- the same way scd2_merge does (load_warehouse.row_hash_sql)
+ALTER TABLE warehouse.dim_customers ADD COLUMN IF NOT EXISTS row_hash CHAR(32);
+UPDATE warehouse.dim_customers
+SET row_hash = md5(ROW(full_name, email, city, state, country, age_group)::text)
+WHERE is_current AND row_hash IS NULL;
+
 -- dim_products (SCD Type 2)
 CREATE TABLE warehouse.dim_products(
     product_key SERIAL PRIMARY KEY,
@@ -47,24 +59,46 @@ CREATE TABLE warehouse.dim_products(
     category VARCHAR(50),
     sub_category VARCHAR(50),
     brand VARCHAR(50),
+    price DECIMAL(10,2),
     price_range VARCHAR(20),
+    row_hash CHAR(32),
     effective_date DATE,
     end_date DATE,
     is_current BOOLEAN
 );
 
--- fact_sales
+CREATE INDEX idx_dim_products_current ON warehouse.dim_products(product_id, is_current);
+
+ALTER TABLE warehouse.dim_products ADD COLUMN IF NOT EXISTS row_hash CHAR(32);
+UPDATE warehouse.dim_products
+SET row_hash = md5(ROW(product_name, category, sub_category, brand, price, price_range)::text)
+WHERE is_current AND row_hash IS NULL;
+
+-- fact_sales: range-partitioned by month on date_key (YYYYMMDD).
+-- Monthly partitions (fact_sales_YYYYMM) are created by the warehouse load.
 CREATE TABLE warehouse.fact_sales(
-    sales_key BIGSERIAL PRIMARY KEY,
-    date_key INT REFERENCES warehouse.dim_date(date_key),
-    customer_key INT REFERENCES warehouse.dim_customers(customer_key),
-    product_key INT REFERENCES warehouse.dim_products(product_key),
-    payment_method_key INT REFERENCES warehouse.dim_payment_method(payment_method_key),
+    sales_key BIGSERIAL,
+    date_key INT NOT NULL CONSTRAINT fact_sales_date_key_fkey REFERENCES warehouse.dim_date(date_key),
+    customer_key INT CONSTRAINT fact_sales_customer_key_fkey REFERENCES warehouse.dim_customers(customer_key),
+    product_key INT CONSTRAINT fact_sales_product_key_fkey REFERENCES warehouse.dim_products(product_key),
+    payment_method_key INT CONSTRAINT fact_sales_payment_method_key_fkey REFERENCES warehouse.dim_payment_method(payment_method_key),
     transaction_id VARCHAR(20),
     quantity INT,
     unit_price DECIMAL(12,2),
     discount_amount DECIMAL(12,2),
     line_total DECIMAL(12,2),
     profit DECIMAL(12,2),
-    created_at TIMESTAMP
+    created_at TIMESTAMP,
+    batch_id BIGINT,
+    PRIMARY KEY (sales_key, date_key)
+) PARTITION BY RANGE (date_key);
+-- Secondary indexes: see create_warehouse_indexes.sql
+
+-- ETL control: high-water mark and last batch per incremental source
+CREATE TABLE warehouse.etl_watermarks(
+    source_name VARCHAR(50) PRIMARY KEY,
+    watermark_value DATE,
+    batch_id BIGINT NOT NULL,
+    rows_loaded BIGINT,
+    updated_at TIMESTAMP
 );
\ No newline at end of file
@@ -9,7 +9,10 @@ CREATE TABLE warehouse.dim_customers(
     age_group VARCHAR(20),
     customer_segment VARCHAR(20),       -- e.g., New / Regular / VIP
     registration_date DATE,
+    row_hash CHAR(32),                  -- md5 over tracked attributes
     effective_date DATE,                -- SCD Type 2
     end_date DATE,
     is_current BOOLEAN
-);
\ No newline at end of file
+);
+
+CREATE INDEX idx_dim_customers_current ON warehouse.dim_customers(customer_id, is_current);
\ No newline at end of file
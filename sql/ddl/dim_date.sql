@@ -9,5 +9,7 @@ CREATE TABLE IF NOT EXISTS warehouse.dim_date (
     day_name VARCHAR(20),
     week_of_year INT,
     is_weekend BOOLEAN,
-    is_holiday BOOLEAN DEFAULT FALSE
+    is_holiday BOOLEAN DEFAULT FALSE,
+    year_month CHAR(7),               -- 'YYYY-MM', sorts chronologically
+    day_of_week INT                   -- ISO: Monday=1 .. Sunday=7
 );
\ No newline at end of file
@@ -5,8 +5,12 @@ CREATE TABLE warehouse.dim_products(
     category VARCHAR(50),
     sub_category VARCHAR(50),
     brand VARCHAR(50),
+    price DECIMAL(10,2),
     price_range VARCHAR(20),           -- Budget, Mid-range, Premium
+    row_hash CHAR(32),                 -- md5 over tracked attributes
     effective_date DATE,
     end_date DATE,
     is_current BOOLEAN
-);
\ No newline at end of file
+);
+
+CREATE INDEX idx_dim_products_current ON warehouse.dim_products(product_id, is_current);
\ No newline at end of file
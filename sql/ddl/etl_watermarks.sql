@@ -0,0 +1,7 @@
+CREATE TABLE warehouse.etl_watermarks(
+    source_name VARCHAR(50) PRIMARY KEY,    -- e.g. "fact_sales"
+    watermark_value DATE,                   -- max transaction_date loaded
+    batch_id BIGINT NOT NULL,               -- last batch, stamped on fact_sales.batch_id
+    rows_loaded BIGINT,
+    updated_at TIMESTAMP
+);
\ No newline at end of file
@@ -1,14 +1,18 @@
 CREATE TABLE warehouse.fact_sales(
-    sales_key BIGSERIAL PRIMARY KEY,
-    date_key INT REFERENCES warehouse.dim_date(date_key),
-    customer_key INT REFERENCES warehouse.dim_customers(customer_key),
-    product_key INT REFERENCES warehouse.dim_products(product_key),
-    payment_method_key INT REFERENCES warehouse.dim_payment_method(payment_method_key),
+    sales_key BIGSERIAL,
+    date_key INT NOT NULL CONSTRAINT fact_sales_date_key_fkey REFERENCES warehouse.dim_date(date_key),   -- Partition key
+    customer_key INT CONSTRAINT fact_sales_customer_key_fkey REFERENCES warehouse.dim_customers(customer_key),
+    product_key INT CONSTRAINT fact_sales_product_key_fkey REFERENCES warehouse.dim_products(product_key),
+    payment_method_key INT CONSTRAINT fact_sales_payment_method_key_fkey REFERENCES warehouse.dim_payment_method(payment_method_key),
     transaction_id VARCHAR(20),          -- Degenerate dimension
     quantity INT,
     unit_price DECIMAL(12,2),
     discount_amount DECIMAL(12,2),       -- Calculated
     line_total DECIMAL(12,2),
     profit DECIMAL(12,2),
-    created_at TIMESTAMP
-);
\ No newline at end of file
+    created_at TIMESTAMP,
+    batch_id BIGINT,                     -- etl_watermarks batch that loaded the row
+    PRIMARY KEY (sales_key, date_key)    -- must include the partition key
+) PARTITION BY RANGE (date_key);         -- Monthly partitions: warehouse.fact_sales_YYYYMM
+
+-- Secondary indexes: see create_warehouse_indexes.sql
\ No newline at end of file
@@ -15,7 +15,7 @@ LIMIT 10;
 -- Query 2: Monthly Sales Trend
 -- Returns: year_month, total_revenue, total_transactions, avg_order_value, unique_customers
 SELECT 
-    CONCAT(d.year, '-', LPAD(d.month::text,2,'0')) AS year_month,
+    d.year_month,
     SUM(f.line_total) AS total_revenue,
     COUNT(DISTINCT f.transaction_id) AS total_transactions,
     ROUND(SUM(f.line_total)/COUNT(DISTINCT f.transaction_id),2) AS avg_order_value,
@@ -23,8 +23,8 @@ SELECT
 FROM warehouse.fact_sales f
 JOIN warehouse.dim_date d
   ON f.date_key = d.date_key
-GROUP BY year_month
-ORDER BY year_month;
+GROUP BY d.year_month
+ORDER BY d.year_month;
 
 -- Query 3: Customer Segmentation Analysis
 -- Buckets: $0-$1k, $1k-$5k, $5k-$10k, $10k+
@@ -126,16 +126,8 @@ SELECT d.day_name,
 FROM warehouse.fact_sales f
 JOIN warehouse.dim_date d
   ON f.date_key = d.date_key
-GROUP BY d.day_name
-ORDER BY CASE d.day_name
-    WHEN 'Monday' THEN 1
-    WHEN 'Tuesday' THEN 2
-    WHEN 'Wednesday' THEN 3
-    WHEN 'Thursday' THEN 4
-    WHEN 'Friday' THEN 5
-    WHEN 'Saturday' THEN 6
-    WHEN 'Sunday' THEN 7
-END;
+GROUP BY d.day_of_week, d.day_name
+ORDER BY d.day_of_week;
 
 -- Query 10: Discount Impact Analysis
 WITH discount_calc AS (
@@ -13,11 +13,6 @@ LEFT JOIN warehouse.dim_customers c
 ON f.customer_key = c.customer_key
 WHERE c.customer_key IS NULL;
 
--- Execution History
-SELECT * FROM pipeline_execution_log
-ORDER BY start_time DESC
-LIMIT 10;
-
 -- Database Stats
 SELECT relname, n_live_tup
 FROM pg_stat_user_tables;
\ No newline at end of file
@@ -0,0 +1,15 @@
+-- Run history queries (SQLite, not the warehouse).
+-- Run against monitoring.history_path, e.g.
+--   sqlite3 data/history/pipeline_history.db < sql/queries/run_history_queries.sql
+-- Tables are created by scripts/monitoring/run_history.py.
+
+-- Execution History
+SELECT * FROM pipeline_execution_log
+ORDER BY start_time DESC
+LIMIT 10;
+
+-- Step Throughput History
+SELECT r.start_time, s.step_name, s.duration_seconds, s.records_processed, s.rows_per_second
+FROM pipeline_step_log s
+JOIN pipeline_execution_log r ON r.run_id = s.run_id
+ORDER BY r.start_time DESC, s.step_name;
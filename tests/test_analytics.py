@@ -0,0 +1,109 @@
+import datetime
+import os
+import time
+from collections import namedtuple
+from decimal import Decimal
+import pandas as pd
+import pyarrow.parquet as pq
+from scripts.analytics.export import arrow_schema, chunk_table, write_dataframe
+from scripts.analytics.profiling import find_regressions, summarize_plan
+from scripts.analytics.result_cache import cache_key, evict, lookup, meta_path, store
+
+Column = namedtuple("Column", ["name", "type_code"])
+
+def test_cache_key_tracks_version_and_params():
+    sql = "SELECT 1 FROM warehouse.fact_sales"
+    key = cache_key(sql, {"date_key_from": 0}, "1-10")
+    assert key == cache_key("SELECT 1\n   FROM warehouse.fact_sales", {"date_key_from": 0}, "1-10")
+    assert key != cache_key(sql, {"date_key_from": 0}, "2-10")
+    assert key != cache_key(sql, {"date_key_from": 20230101}, "1-10")
+    assert key != cache_key(sql, {"date_key_from": 0}, "1-10", "parquet")
+
+def test_cache_key_expires_daily_for_current_date_queries(monkeypatch):
+    from scripts.analytics import result_cache
+
+    class Tomorrow(datetime.date):
+        @classmethod
+        def today(cls):
+            return datetime.date.today() + datetime.timedelta(days=1)
+
+    sql = "SELECT CURRENT_DATE - registration_date FROM warehouse.mv_customer_lifetime_value"
+    static_key, dated_key = cache_key("SELECT 1", {}, "1"), cache_key(sql, {}, "1")
+    monkeypatch.setattr(result_cache, "date", Tomorrow)
+    assert cache_key("SELECT 1", {}, "1") == static_key
+    assert cache_key(sql, {}, "1") != dated_key
+
+def test_cache_round_trip(tmp_path):
+    key = cache_key("SELECT 1", {}, "1")
+    cache_dir = tmp_path / "cache"
+    assert lookup(key, cache_dir) is None
+
+    export = tmp_path / "query1.csv"
+    export.write_text("a,b\n1,2\n")
+    store(key, export, {"rows": 1, "columns": 2}, cache_dir)
+    cached_path, meta = lookup(key, cache_dir)
+    assert cached_path.read_text() == "a,b\n1,2\n"
+    assert meta["rows"] == 1 and meta["columns"] == 2
+
+def test_cache_eviction(tmp_path):
+    export = tmp_path / "query1.csv"
+    export.write_text("x\n1\n")
+    cache_dir = tmp_path / "cache"
+    old_key, new_key = cache_key("SELECT 1", {}, "1"), cache_key("SELECT 1", {}, "2")
+    store(old_key, export, {}, cache_dir)
+    store(new_key, export, {}, cache_dir)
+    old_meta = meta_path(old_key, cache_dir)
+    old_meta.write_text('{"file": "%s.csv", "stored_at": %f}' % (old_key, time.time() - 7200))
+
+    assert evict(max_age_hours=1, cache_dir=cache_dir) == 1
+    assert lookup(old_key, cache_dir) is None
+    assert lookup(new_key, cache_dir) is not None
+
+    assert evict(max_size_mb=0, cache_dir=cache_dir) == 1
+    assert not os.listdir(cache_dir)
+
+def test_parquet_chunks_share_schema(tmp_path):
+    description = [Column("state", 1043), Column("total_revenue", 1700),
+                   Column("customers", 20), Column("first_day", 1082)]
+    schema = arrow_schema(description)
+    first = chunk_table([("CA", Decimal("10.50"), 3, datetime.date(2023, 1, 1))], description, schema)
+    # an all-NULL chunk must not change the column types
+    second = chunk_table([(None, None, None, None)], description, schema)
+    assert first.schema == second.schema == schema
+
+def test_write_dataframe_parquet(tmp_path):
+    path = tmp_path / "query.parquet"
+    rows, columns = write_dataframe(pd.DataFrame({"revenue": [Decimal("1.25")], "n": [1]}), path, "parquet")
+    assert (rows, columns) == (1, 2)
+    assert pq.read_table(path).column("revenue").to_pylist() == [1.25]
+
+def plan(execution_ms, scan_relation="fact_sales_202311", actual_rows=100, plan_rows=100):
+    return {
+        "Execution Time": execution_ms,
+        "Planning Time": 0.5,
+        "Plan": {
+            "Node Type": "Aggregate", "Plan Rows": 1, "Actual Rows": 1, "Actual Loops": 1,
+            "Plans": [{
+                "Node Type": "Seq Scan" if scan_relation else "Index Scan",
+                "Relation Name": scan_relation or "fact_sales_202311",
+                "Plan Rows": plan_rows, "Actual Rows": actual_rows, "Actual Loops": 1
+            }]
+        }
+    }
+
+def test_summarize_plan():
+    summary = summarize_plan(plan(12.345, actual_rows=5000, plan_rows=50))
+    assert summary["execution_time_ms"] == 12.35
+    assert summary["seq_scans"] == ["fact_sales"]
+    assert summary["max_row_estimate_error"] == 100
+    assert summary["max_row_estimate_error_node"] == "Seq Scan"
+
+def test_find_regressions():
+    baseline = summarize_plan(plan(100, scan_relation=None))
+    assert find_regressions(baseline, None) == []
+    assert find_regressions(summarize_plan(plan(110, scan_relation=None)), baseline) == []
+
+    flags = find_regressions(summarize_plan(plan(200, actual_rows=10_000)), baseline)
+    assert any("execution time up 100%" in f for f in flags)
+    assert "new seq scan on fact_sales" in flags
+    assert any("row estimate off by 100.0x" in f for f in flags)
@@ -1,13 +1,16 @@
 import os
 import pandas as pd
 import re
+import numpy as np
 import pytest
 from scripts.data_generation.generate_data import (
     generate_customers,
     generate_products,
     generate_transactions,
-    generate_transaction_items
+    generate_transaction_items,
+    split_range
 )
+from scripts.utils.table_io import read_table, table_path, write_table
 
 @pytest.fixture
 def customers():
@@ -62,3 +65,37 @@ def test_discount_percentage_range(items):
 
 def test_quantity_positive(items):
     assert (items["quantity"] > 0).all()
+
+def test_total_amount_matches_items(transactions, products):
+    items, transactions = generate_transaction_items(transactions, products)
+    totals = items.groupby("transaction_id")["line_total"].sum().round(2)
+    assert (transactions.set_index("transaction_id")["total_amount"] == totals).all()
+
+def test_products_unique_within_transaction(items):
+    assert not items.duplicated(["transaction_id", "product_id"]).any()
+
+def test_seeded_generation_is_deterministic():
+    first = generate_products(20, np.random.default_rng(7))
+    second = generate_products(20, np.random.default_rng(7))
+    pd.testing.assert_frame_equal(first, second)
+
+def test_split_range_covers_all_ids():
+    ranges = split_range(10, 3)
+    assert ranges == [(1, 4), (5, 3), (8, 3)]
+    assert sum(count for _, count in ranges) == 10
+
+def test_customer_emails_unique():
+    customers = generate_customers(2000)
+    assert customers["email"].is_unique
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_table_file_round_trip(tmp_path, transactions, fmt):
+    if fmt != "csv":
+        pytest.importorskip("pyarrow")
+    path = table_path(tmp_path, "transactions", fmt)
+    write_table(transactions, path, "transactions", fmt)
+
+    df = read_table(path, "transactions", fmt, columns=["transaction_id", "transaction_date"])
+    assert list(df.columns) == ["transaction_id", "transaction_date"]
+    assert len(df) == len(transactions)
+    assert str(df["transaction_date"].dtype) == "datetime64[ns]"
@@ -45,3 +45,85 @@ def test_transaction_rollback(db_connection):
         db_connection.rollback()
     cur.execute("SELECT * FROM staging.customers WHERE customer_id='CUST9999'")
     assert cur.fetchone() is None
+
+class RecordingCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.log.append(" ".join(sql.split()))
+
+    def copy_expert(self, sql, file_obj):
+        data = file_obj.read().splitlines()
+        self.log.append((sql, data))
+        self.rowcount = len(data)
+
+def recording_pool(log):
+    from unittest import mock
+
+    pool = mock.Mock()
+    pool.getconn.side_effect = lambda: mock.MagicMock(cursor=lambda: RecordingCursor(log))
+    return pool
+
+def test_parallel_swap_keeps_staging_tables():
+    from scripts.ingestion import ingest_to_staging as ingest
+
+    log = []
+    cur = RecordingCursor(log)
+    ingest.create_load_tables(cur)
+    ingest.swap_in_load_tables(cur)
+
+    assert "CREATE UNLOGGED TABLE staging.customers_load (LIKE staging.customers INCLUDING DEFAULTS)" in log
+    assert log[-3:] == [
+        "TRUNCATE staging.transaction_items",
+        "INSERT INTO staging.transaction_items SELECT * FROM staging.transaction_items_load",
+        "DROP TABLE staging.transaction_items_load"
+    ]
+    # the staging tables are refilled, never dropped or renamed
+    assert not [sql for sql in log if "RENAME" in sql or sql.startswith("DROP TABLE staging.customers ")]
+
+def test_split_table_is_copied_in_chunks(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from scripts.ingestion import ingest_to_staging as ingest
+
+    (tmp_path / "transaction_items.csv").write_text(
+        "item_id,transaction_id,product_id,quantity,unit_price,discount_percentage,line_total\n"
+        + "".join(f"ITEM{i},TXN{i},PROD1,1,10.0,0,10.0\n" for i in range(5))
+    )
+    monkeypatch.setattr(ingest, "DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(ingest, "RAW_FORMAT", "csv")
+    monkeypatch.setattr(ingest, "INGEST_CFG", {"split_tables": ["transaction_items"], "chunk_rows": 2})
+
+    log = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = ingest.submit_table(executor, recording_pool(log), "transaction_items", max_pending=2)
+        results = [f.result() for f in futures]
+
+    assert [rows for rows, _, _ in results] == [2, 2, 1]
+    copies = [entry for entry in log if isinstance(entry, tuple)]
+    assert all(sql.startswith("COPY staging.transaction_items_load (item_id,") for sql, _ in copies)
+    assert sorted(line.split(",")[0] for _, data in copies for line in data) == [f"ITEM{i}" for i in range(5)]
+
+def test_parallel_failure_reraises_original_error(monkeypatch):
+    from unittest import mock
+    from scripts.ingestion import ingest_to_staging as ingest
+
+    conn = mock.MagicMock()
+    pool = mock.Mock()
+    # the cleanup can't get a connection either; the load's own error must still surface
+    pool.getconn.side_effect = [conn, RuntimeError("pool exhausted")]
+
+    def broken_submit(*args):
+        raise ValueError("bad chunk")
+    monkeypatch.setattr(ingest, "submit_table", broken_submit)
+
+    with pytest.raises(ValueError, match="bad chunk"):
+        ingest.ingest_parallel({"tables_loaded": {}}, shared_pool=pool)
+    pool.putconn.assert_called_once_with(conn)
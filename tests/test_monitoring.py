@@ -0,0 +1,54 @@
+import sqlite3
+from scripts.monitoring.run_history import compare_run, record_run
+
+def make_report(run_id, day, steps):
+    return {
+        "pipeline_execution_id": run_id,
+        "start_time": f"2024-01-{day:02d}T02:00:00+00:00",
+        "end_time": f"2024-01-{day:02d}T02:10:00+00:00",
+        "status": "success",
+        "execution_mode": "subprocess",
+        "total_duration_seconds": 600.0,
+        "steps_executed": {
+            name: {
+                "status": "success",
+                "duration_seconds": duration,
+                "records_processed": 10000,
+                "metrics": {"rows_per_second": rps, "bytes_processed": 0, "db_round_trips": 3}
+            }
+            for name, (rps, duration) in steps.items()
+        }
+    }
+
+def test_record_run_keeps_every_run(tmp_path):
+    db = tmp_path / "history.db"
+    record_run(make_report("PIPE_1", 1, {"fact_sales": (1000.0, 10.0)}), db)
+    record_run(make_report("PIPE_2", 2, {"fact_sales": (1100.0, 9.0)}), db)
+    # re-recording a run replaces it instead of duplicating its steps
+    record_run(make_report("PIPE_2", 2, {"fact_sales": (1200.0, 8.0)}), db)
+
+    conn = sqlite3.connect(db)
+    runs = conn.execute("SELECT run_id FROM pipeline_execution_log ORDER BY start_time DESC").fetchall()
+    steps = conn.execute("SELECT run_id, rows_per_second FROM pipeline_step_log ORDER BY run_id").fetchall()
+    assert runs == [("PIPE_2",), ("PIPE_1",)]
+    assert steps == [("PIPE_1", 1000.0), ("PIPE_2", 1200.0)]
+
+def test_compare_run_flags_throughput_drops_against_baseline(tmp_path):
+    db = tmp_path / "history.db"
+    for day in range(1, 6):
+        record_run(make_report(f"PIPE_{day}", day, {
+            "fact_sales": (1000.0, 10.0), "dim_customers": (500.0, 2.0), "indexes": (None, 4.0)
+        }), db)
+    record_run(make_report("PIPE_6", 6, {
+        "fact_sales": (700.0, 14.0), "dim_customers": (450.0, 2.2), "indexes": (None, 6.0)
+    }), db)
+
+    regressions = {r["step"]: r for r in compare_run(baseline_runs=3, drop_pct=20, path=db)}
+    assert set(regressions) == {"fact_sales", "indexes"}
+    assert regressions["fact_sales"]["metric"] == "rows_per_second"
+    assert regressions["fact_sales"]["change_pct"] == -30.0
+    assert regressions["indexes"]["metric"] == "duration_seconds"
+
+    # an earlier run is compared only with the runs before it
+    assert compare_run("PIPE_5", baseline_runs=3, drop_pct=20, path=db) == []
+    assert compare_run("PIPE_1", baseline_runs=3, drop_pct=20, path=db) == []
@@ -0,0 +1,203 @@
+import threading
+import time
+import pytest
+from scripts.utils.dag import critical_path, run_dag, validate_dag
+
+TASKS = {
+    "generate": {"depends_on": []},
+    "dim_a": {"depends_on": ["generate"]},
+    "dim_b": {"depends_on": ["generate"]},
+    "fact": {"depends_on": ["dim_a", "dim_b"]},
+    "report": {"depends_on": ["fact"]},
+    "checks": {"depends_on": ["fact"]}
+}
+
+def test_validate_dag_orders_dependencies_first():
+    order = validate_dag(TASKS)
+    for name, spec in TASKS.items():
+        assert all(order.index(dep) < order.index(name) for dep in spec["depends_on"])
+
+def test_validate_dag_rejects_cycles_and_unknown_tasks():
+    with pytest.raises(ValueError, match="cycle"):
+        validate_dag({"a": {"depends_on": ["b"]}, "b": {"depends_on": ["a"]}})
+    with pytest.raises(ValueError, match="unknown"):
+        validate_dag({"a": {"depends_on": ["missing"]}})
+
+def test_run_dag_runs_independent_tasks_concurrently():
+    lock = threading.Lock()
+    running, peak, finished = [0], [0], []
+
+    def run_task(name):
+        with lock:
+            assert all(dep in finished for dep in TASKS[name]["depends_on"])
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+            finished.append(name)
+        return True
+
+    assert set(run_dag(TASKS, run_task, max_workers=4).values()) == {"success"}
+    assert peak[0] == 2
+
+def test_run_dag_skips_downstream_of_failures():
+    status = run_dag(TASKS, lambda name: name != "dim_b", max_workers=2)
+    assert status["dim_a"] == "success"
+    assert status["dim_b"] == "failed"
+    assert status["fact"] == status["report"] == status["checks"] == "skipped"
+
+def test_critical_path_follows_latest_dependency():
+    timings = {
+        "generate": (0, 10), "dim_a": (10, 15), "dim_b": (10, 40),
+        "fact": (40, 60), "report": (60, 62), "checks": (60, 70)
+    }
+    assert critical_path(TASKS, timings) == ["generate", "dim_b", "fact", "checks"]
+
+def test_run_step_retries_retryable_errors():
+    from scripts.pipeline_orchestrator import report, run_step
+
+    attempts = []
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise ConnectionError("connection reset by peer")
+
+    assert run_step("flaky_step", flaky, retries=3, backoff=[0])
+    assert report["steps_executed"]["flaky_step"]["retry_attempts"] == 1
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad data")
+
+    attempts.clear()
+    assert not run_step("broken_step", broken, retries=3, backoff=[0])
+    assert len(attempts) == 1
+
+def test_in_process_mode_covers_every_task():
+    from scripts.pipeline_orchestrator import PIPELINE_TASKS, in_process_actions
+
+    assert set(in_process_actions(pool=None)) == set(PIPELINE_TASKS)
+
+def test_file_digest_tracks_content(tmp_path):
+    from scripts.utils.checkpoints import file_digest
+
+    path = tmp_path / "customers.csv"
+    assert file_digest(path) is None
+    path.write_text("customer_id\nCUST0001\n")
+    memo = {}
+    first = file_digest(path, memo)
+    assert memo[str(path)][2] == first
+    assert file_digest(path, memo) == first
+
+    path.write_text("customer_id\nCUST0002\n")
+    assert file_digest(path, memo) != first
+
+def test_checkpoints_persist_and_invalidate(tmp_path):
+    from scripts.utils.checkpoints import fingerprint, load_checkpoints, update_task
+
+    path = tmp_path / "checkpoints.json"
+    checkpoints = load_checkpoints(path)
+    assert fingerprint({"a": 1, "b": [1, 2]}) == fingerprint({"b": [1, 2], "a": 1})
+
+    update_task(checkpoints, "ingestion", {"fingerprint": "abc", "marker": "def"}, path)
+    assert load_checkpoints(path)["tasks"]["ingestion"]["marker"] == "def"
+
+    update_task(checkpoints, "ingestion", None, path)
+    assert "ingestion" not in load_checkpoints(path)["tasks"]
+
+def test_step_metrics_collect_from_worker_threads(tmp_path, monkeypatch):
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from scripts.utils import metrics
+
+    metrics_path = tmp_path / "step.json"
+    monkeypatch.setenv(metrics.METRICS_PATH_ENV, str(metrics_path))
+
+    def copy_chunk(rows):
+        metrics.record_round_trips()
+        metrics.record_write("staging.transactions", rows, nbytes=rows * 10)
+
+    with metrics.step("ingestion") as step_metrics:
+        metrics.record_read("raw.transactions", 300, nbytes=4096)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(metrics.bind(copy_chunk), [100, 100, 100]))
+
+    result = step_metrics.as_dict()
+    assert result["rows_read"] == {"raw.transactions": 300}
+    assert result["rows_written"] == {"staging.transactions": 300}
+    assert result["records_processed"] == 300
+    assert result["bytes_processed"] == 4096 + 3000
+    assert result["db_round_trips"] == 3
+    assert json.loads(metrics_path.read_text()) == result
+
+    # outside a step reporting is a no-op
+    metrics.record_write("staging.transactions", 5)
+    assert step_metrics.rows_written["staging.transactions"] == 300
+
+def test_summarize_metrics_orders_by_throughput():
+    from scripts.pipeline_orchestrator import summarize_metrics
+
+    def step_metrics(rows, rps):
+        return {"records_processed": rows, "bytes_processed": rows * 10, "db_round_trips": 2,
+                "peak_rss_mb": 100.0, "rows_per_second": rps}
+
+    summary = summarize_metrics({
+        "ingestion": {"status": "success", "metrics": step_metrics(1000, 500.0)},
+        "warehouse_fact_sales": {"status": "success", "metrics": step_metrics(1000, 50.0)},
+        "warehouse_indexes": {"status": "success", "metrics": None}
+    })
+    assert summary["records_processed"] == 2000
+    assert summary["db_round_trips"] == 4
+    assert list(summary["throughput_rows_per_second"]) == ["warehouse_fact_sales", "ingestion"]
+
+def test_resume_skips_every_task_when_nothing_changed(tmp_path, monkeypatch):
+    from scripts import pipeline_orchestrator as orchestrator
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "processed").mkdir(parents=True)
+    batch, ran = [0], []
+
+    def fake_action(name, spec):
+        def action():
+            ran.append(name)
+            if name == "warehouse_fact_sales":
+                batch[0] += 1  # every load writes last_batch_id + 1
+        return action
+
+    monkeypatch.setattr(orchestrator, "subprocess_action", fake_action)
+    monkeypatch.setattr(orchestrator, "fact_batch_id", lambda: batch[0])
+    monkeypatch.setitem(orchestrator.report, "steps_executed", {})
+
+    assert orchestrator.main(mode="subprocess", resume=True)["status"] == "success"
+    assert set(ran) == set(orchestrator.PIPELINE_TASKS)
+
+    ran.clear()
+    report = orchestrator.main(mode="subprocess", resume=True)
+    assert ran == []
+    assert sorted(report["steps_cached"]) == sorted(orchestrator.PIPELINE_TASKS)
+
+    # a fact load outside the pipeline invalidates fact_sales and everything downstream of it
+    batch[0] += 1
+    orchestrator.main(mode="subprocess", resume=True)
+    assert "warehouse_fact_sales" in ran and "analytics" in ran
+    assert "warehouse_dim_customers" not in ran
+
+def test_warehouse_loaders_use_a_connection_per_thread():
+    from concurrent.futures import ThreadPoolExecutor
+    from unittest import mock
+    from scripts.transformation import load_warehouse
+
+    barrier = threading.Barrier(2)
+
+    def load(connection):
+        load_warehouse.connect(connection)
+        barrier.wait()  # both threads connected before either uses the cursor
+        load_warehouse.cursor.execute("SELECT 1")
+        load_warehouse.close_connection(close=False)
+
+    connections = [mock.MagicMock(), mock.MagicMock()]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(load, connections))
+    for connection in connections:
+        connection.cursor.return_value.execute.assert_called_once_with("SELECT 1")
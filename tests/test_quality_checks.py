@@ -33,3 +33,15 @@ def referential_integrity(fact_data, dim_data):
 def data_consistency(fact_data, prod_data):
     failed = sum(1 for f, p in zip(fact_data, prod_data) if f["line_total"] != p["line_total"])
     return {"failed": failed}
+
+def test_pooled_connection_returned_when_a_check_fails():
+    from unittest import mock
+
+    conn = mock.MagicMock()
+    conn.cursor.return_value.__enter__.return_value.execute.side_effect = RuntimeError("connection lost")
+    pool = mock.Mock()
+    pool.getconn.return_value = conn
+
+    with pytest.raises(RuntimeError):
+        run_quality_checks(pool)
+    pool.putconn.assert_called_once_with(conn)
@@ -2,6 +2,7 @@ import pytest
 import psycopg2
 from psycopg2 import sql
 from decimal import Decimal
+import pandas as pd
 
 DB_CONFIG = {
     "host": "localhost",
@@ -59,3 +60,54 @@ def test_aggregates_match_fact(db_connection):
     assert sum_line_total is not None
     assert sum_line_total > 0
 
+
+def test_dim_date_calendar_attributes():
+    from scripts.transformation.date_dimension import build_dim_date
+
+    dates = build_dim_date("2023-12-30", "2024-01-02", pd.DatetimeIndex(["2024-01-01"]))
+    assert dates["date_key"].tolist() == [20231230, 20231231, 20240101, 20240102]
+    assert dates["year_month"].tolist() == ["2023-12", "2023-12", "2024-01", "2024-01"]
+    assert dates["day_of_week"].tolist() == [6, 7, 1, 2]
+    assert dates["is_weekend"].tolist() == [True, True, False, False]
+    assert dates["is_holiday"].tolist() == [False, False, True, False]
+    assert dates["week_of_year"].tolist() == [52, 52, 1, 1]
+
+def test_build_fact_sales_arithmetic_and_keys():
+    from scripts.transformation.load_warehouse import FACT_COLUMNS, build_fact_sales
+
+    transactions = pd.DataFrame({
+        "transaction_id": ["TXN1"], "customer_id": ["CUST1"],
+        "transaction_date": ["2023-11-05"], "payment_method": ["UPI"]
+    })
+    items = pd.DataFrame({
+        "transaction_id": ["TXN1", "TXN1"], "product_id": ["PROD1", "PROD2"],
+        "quantity": [2, 1], "unit_price": [100.0, 50.0], "discount_percentage": [10, 0]
+    })
+    products = pd.DataFrame({"product_id": ["PROD1", "PROD2"], "cost": [60.0, 20.0]})
+    key_map = lambda mapping: pd.Series(mapping, dtype="Int64")
+
+    facts = build_fact_sales(
+        transactions, items, products,
+        key_map({"CUST1": 7}), key_map({"PROD1": 1, "PROD2": 2}), key_map({"UPI": 3})
+    )
+    assert list(facts.columns) == FACT_COLUMNS
+    assert facts["line_total"].tolist() == [180.0, 50.0]
+    assert facts["discount_amount"].tolist() == [20.0, 0.0]
+    assert facts["profit"].tolist() == [60.0, 30.0]
+    assert facts["date_key"].tolist() == [20231105, 20231105]
+    assert facts["customer_key"].tolist() == [7, 7]
+
+    with pytest.raises(ValueError, match="product_key"):
+        build_fact_sales(
+            transactions, items, products,
+            key_map({"CUST1": 7}), key_map({"PROD1": 1}), key_map({"UPI": 3})
+        )
+
+def test_managed_foreign_keys_come_from_schema_ddl():
+    from scripts.transformation.index_manager import load_foreign_keys
+
+    foreign_keys = load_foreign_keys()
+    assert set(foreign_keys) == {"warehouse.fact_sales"}
+    assert foreign_keys["warehouse.fact_sales"]["fact_sales_customer_key_fkey"] == \
+        "FOREIGN KEY (customer_key) REFERENCES warehouse.dim_customers(customer_key)"
+    assert len(foreign_keys["warehouse.fact_sales"]) == 4